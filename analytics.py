@@ -1,160 +1,210 @@
 import sqlite3
-import json
 import re
-from datetime import datetime, timezone
-from collections import Counter, defaultdict
-from typing import Dict, List, Any, Optional
+from array import array
+from collections import defaultdict
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, List, Any
 from pathlib import Path
 
+from indexer import PROVIDER_SQL
+
+
+# Keep IN (...) lists under SQLite's default host-parameter limit
+_SQL_BATCH_SIZE = 500
+
+_DAY_NAMES = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+
+# Patterns used by topic extraction
+_TITLE_WORD_RE = re.compile(r'\b[A-Za-z]{3,}\b')
+_ENTITY_PATTERNS = {
+    'companies': re.compile(r'\b(?:Google|Apple|Microsoft|Amazon|Meta|Tesla|OpenAI|Anthropic|Netflix|Spotify)\b', re.IGNORECASE),
+    'technologies': re.compile(r'\b(?:Python|JavaScript|React|AI|ML|SQL|API|AWS|Docker|Kubernetes)\b', re.IGNORECASE),
+    'topics': re.compile(r'\b(?:coding|programming|design|marketing|business|startup|product|data|analytics)\b', re.IGNORECASE)
+}
+
+# Common AI discussion themes used by conversation summaries
+_THEME_WORDS = {
+    'coding': ('code', 'coding', 'programming', 'python', 'javascript', 'function', 'class', 'variable'),
+    'business': ('business', 'strategy', 'market', 'revenue', 'customer', 'product', 'startup'),
+    'creative': ('creative', 'design', 'art', 'writing', 'story', 'novel', 'poem', 'music'),
+    'technical': ('technical', 'architecture', 'system', 'database', 'api', 'server', 'cloud'),
+    'analysis': ('analysis', 'data', 'analytics', 'statistics', 'research', 'study', 'report'),
+    'planning': ('plan', 'planning', 'strategy', 'roadmap', 'timeline', 'schedule', 'project')
+}
+# Some words belong to several themes (e.g. "strategy"), so map each to all of them
+_THEMES_BY_WORD = defaultdict(list)
+for _theme, _words in _THEME_WORDS.items():
+    for _word in _words:
+        _THEMES_BY_WORD[_word].append(_theme)
+# One alternation lets a single scan of the text find every theme
+_THEMES_RE = re.compile(
+    r'\b(?:' + '|'.join(sorted(_THEMES_BY_WORD, key=len, reverse=True)) + r')\b',
+    re.IGNORECASE
+)
+
 
 class ConversationAnalytics:
     """Advanced analytics for AI conversation data"""
     
     def __init__(self, db_path: str):
-        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        # Read-only: the covering indexes analytics relies on are created by
+        # the indexer (see indexer.DOCS_INDEXES)
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        # Analytics prepares many distinct CASE-heavy statements; keep them all cached
+        self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=256)
         self.conn.row_factory = sqlite3.Row
-    
+        self.conn.execute("PRAGMA mmap_size=268435456;")
+        self.conn.execute("PRAGMA cache_size=-65536;")
+        # Older indexes may lack the generated provider column
+        cols = [r[1] for r in self.conn.execute("PRAGMA table_xinfo(docs)")]
+        self._provider = "provider" if "provider" in cols else PROVIDER_SQL
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "ConversationAnalytics":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
     def get_overview_stats(self) -> Dict[str, Any]:
         """Get high-level conversation statistics"""
-        stats = {}
         
-        # Total counts
-        total_docs = self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
-        total_convs = self.conn.execute("SELECT COUNT(DISTINCT conv_id) FROM docs").fetchone()[0]
+        # Totals, per-provider conversation counts and date range in one scan
+        totals = self.conn.execute(f"""
+            WITH d AS (
+                SELECT conv_id, date,
+                       {self._provider} as provider
+                FROM docs
+            )
+            SELECT COUNT(*) as total_docs,
+                   COUNT(DISTINCT conv_id) as total_convs,
+                   MIN(date) as earliest,
+                   MAX(date) as latest,
+                   COUNT(DISTINCT CASE WHEN provider = 'Claude' THEN conv_id END) as Claude,
+                   COUNT(DISTINCT CASE WHEN provider = 'ChatGPT' THEN conv_id END) as ChatGPT,
+                   COUNT(DISTINCT CASE WHEN provider = 'Other' THEN conv_id END) as Other
+            FROM d
+        """).fetchone()
         
-        # Provider breakdown
+        # Message counts per (provider, role), pivoted into both breakdowns
         provider_stats = {}
-        providers = self.conn.execute("""
-            SELECT 
-                CASE 
-                    WHEN source LIKE '%anthropic%' THEN 'Claude'
-                    WHEN source LIKE '%chatgpt%' THEN 'ChatGPT'
-                    ELSE 'Other'
-                END as provider,
-                COUNT(*) as count,
-                COUNT(DISTINCT conv_id) as conversations
-            FROM docs 
-            GROUP BY provider
-        """).fetchall()
-        
-        for p in providers:
-            provider_stats[p['provider']] = {
-                'messages': p['count'],
-                'conversations': p['conversations']
-            }
-        
-        # Role breakdown
         role_stats = {}
-        roles = self.conn.execute("""
-            SELECT role, COUNT(*) as count 
+        rows = self.conn.execute(f"""
+            SELECT 
+                {self._provider} as provider,
+                role,
+                COUNT(*) as count
             FROM docs 
-            GROUP BY role
-        """).fetchall()
-        
-        for r in roles:
-            role_stats[r['role']] = r['count']
+            GROUP BY provider, role
+        """)
         
-        # Date range
-        date_range = self.conn.execute("""
-            SELECT MIN(date) as earliest, MAX(date) as latest
-            FROM docs WHERE date IS NOT NULL
-        """).fetchone()
+        for r in rows:
+            provider = r['provider']
+            if provider not in provider_stats:
+                provider_stats[provider] = {
+                    'messages': 0,
+                    'conversations': totals[provider]
+                }
+            provider_stats[provider]['messages'] += r['count']
+            role_stats[r['role']] = role_stats.get(r['role'], 0) + r['count']
         
         return {
-            'total_messages': total_docs,
-            'total_conversations': total_convs,
+            'total_messages': totals['total_docs'],
+            'total_conversations': totals['total_convs'],
             'providers': provider_stats,
             'roles': role_stats,
             'date_range': {
-                'earliest': date_range['earliest'],
-                'latest': date_range['latest']
+                'earliest': totals['earliest'],
+                'latest': totals['latest']
             }
         }
     
     def get_temporal_patterns(self) -> Dict[str, Any]:
         """Analyze conversation patterns by time"""
         
-        # Get all messages with timestamps
-        rows = self.conn.execute("""
-            SELECT ts, date, role, 
-                   CASE 
-                       WHEN source LIKE '%anthropic%' THEN 'Claude'
-                       WHEN source LIKE '%chatgpt%' THEN 'ChatGPT'
-                       ELSE 'Other'
-                   END as provider
+        # Bucket in SQLite with a single grouped scan, so only one row per
+        # (hour, weekday, month, provider) comes back. Hour and weekday are
+        # plain integer arithmetic on the epoch seconds (1970-01-01 was a
+        # Thursday); only the month needs strftime.
+        rows = self.conn.execute(f"""
+            SELECT (CAST(ts AS INTEGER) / 3600) % 24 as hour,
+                   (CAST(ts AS INTEGER) / 86400 + 4) % 7 as dow,
+                   strftime('%Y-%m', ts, 'unixepoch') as month,
+                   {self._provider} as provider,
+                   COUNT(*) as count
             FROM docs 
             WHERE ts > 0
-        """).fetchall()
+            GROUP BY hour, dow, month, provider
+        """)
         
-        patterns = {
-            'by_hour': defaultdict(int),
-            'by_day_of_week': defaultdict(int),
-            'by_month': defaultdict(int),
-            'by_provider_hour': defaultdict(lambda: defaultdict(int)),
-            'activity_timeline': []
-        }
+        # Fixed-size counters indexed directly by hour / weekday number
+        by_hour = array('q', [0]) * 24
+        by_day_of_week = array('q', [0]) * 7
+        by_provider_hour = {}
+        by_month = defaultdict(int)
         
-        for row in rows:
-            try:
-                dt = datetime.fromtimestamp(row['ts'], tz=timezone.utc)
-                
-                # Hour of day (0-23)
-                patterns['by_hour'][dt.hour] += 1
-                
-                # Day of week (0=Monday, 6=Sunday)
-                patterns['by_day_of_week'][dt.strftime('%A')] += 1
-                
-                # Month
-                patterns['by_month'][dt.strftime('%Y-%m')] += 1
-                
-                # Provider by hour
-                patterns['by_provider_hour'][row['provider']][dt.hour] += 1
-                
-            except Exception:
-                continue
+        for hour, dow, month, provider, count in rows:
+            by_hour[hour] += count
+            # Day of week counts from Sunday=0
+            by_day_of_week[dow] += count
+            if month is not None:
+                by_month[month] += count
+            if provider not in by_provider_hour:
+                by_provider_hour[provider] = array('q', [0]) * 24
+            by_provider_hour[provider][hour] += count
         
-        # Convert defaultdicts to regular dicts for JSON serialization
+        # Convert counters to sparse dicts for JSON serialization
         return {
-            'by_hour': dict(patterns['by_hour']),
-            'by_day_of_week': dict(patterns['by_day_of_week']),
-            'by_month': dict(patterns['by_month']),
-            'by_provider_hour': {k: dict(v) for k, v in patterns['by_provider_hour'].items()}
+            'by_hour': {h: c for h, c in enumerate(by_hour) if c},
+            'by_day_of_week': {_DAY_NAMES[d]: c for d, c in enumerate(by_day_of_week) if c},
+            'by_month': dict(sorted(by_month.items())),
+            'by_provider_hour': {
+                p: {h: c for h, c in enumerate(hours) if c}
+                for p, hours in by_provider_hour.items()
+            }
         }
     
     def extract_topics(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Extract common topics from conversations"""
         
-        # Get conversation titles and content samples
-        rows = self.conn.execute("""
-            SELECT DISTINCT conv_id, title, 
-                   GROUP_CONCAT(content, ' ') as combined_content,
-                   COUNT(*) as message_count,
-                   MIN(date) as start_date,
-                   MAX(date) as end_date,
-                   CASE 
-                       WHEN source LIKE '%anthropic%' THEN 'Claude'
-                       WHEN source LIKE '%chatgpt%' THEN 'ChatGPT'
-                       ELSE 'Other'
-                   END as provider
-            FROM docs 
-            WHERE title IS NOT NULL AND title != ''
-            GROUP BY conv_id
+        # Get conversation titles and content samples. Only the first few
+        # messages (each capped) are concatenated, since just 500 chars are used.
+        rows = self.conn.execute(f"""
+            WITH top AS (
+                SELECT conv_id, title, 
+                       COUNT(*) as message_count,
+                       MIN(date) as start_date,
+                       MAX(date) as end_date,
+                       {self._provider} as provider
+                FROM docs 
+                WHERE title IS NOT NULL AND title != ''
+                GROUP BY conv_id
+                ORDER BY message_count DESC
+                LIMIT ?
+            )
+            SELECT top.*,
+                   (SELECT GROUP_CONCAT(sample, ' ') FROM (
+                        SELECT substr(content, 1, 500) as sample
+                        FROM docs d
+                        WHERE d.conv_id = top.conv_id
+                        ORDER BY d.ts, d.rowid
+                        LIMIT 20
+                   )) as combined_content
+            FROM top
             ORDER BY message_count DESC
-            LIMIT ?
-        """, (limit,)).fetchall()
+        """, (limit,))
         
         topics = []
         for row in rows:
             # Simple keyword extraction from titles
-            title_words = re.findall(r'\b[A-Za-z]{3,}\b', row['title'].lower())
+            title_words = _TITLE_WORD_RE.findall(row['title'].lower())
             content_sample = (row['combined_content'] or '')[:500]
             
             # Extract entities (simple pattern matching)
-            entities = {
-                'companies': re.findall(r'\b(?:Google|Apple|Microsoft|Amazon|Meta|Tesla|OpenAI|Anthropic|Netflix|Spotify)\b', content_sample, re.IGNORECASE),
-                'technologies': re.findall(r'\b(?:Python|JavaScript|React|AI|ML|SQL|API|AWS|Docker|Kubernetes)\b', content_sample, re.IGNORECASE),
-                'topics': re.findall(r'\b(?:coding|programming|design|marketing|business|startup|product|data|analytics)\b', content_sample, re.IGNORECASE)
-            }
+            entities = {k: pattern.findall(content_sample) for k, pattern in _ENTITY_PATTERNS.items()}
             
             topics.append({
                 'conv_id': row['conv_id'],
@@ -174,19 +224,24 @@ class ConversationAnalytics:
         """Generate summaries for specific conversations"""
         summaries = {}
         
-        for conv_id in conv_ids:
-            rows = self.conn.execute("""
-                SELECT title, role, content, date, ts,
-                       CASE 
-                           WHEN source LIKE '%anthropic%' THEN 'Claude'
-                           WHEN source LIKE '%chatgpt%' THEN 'ChatGPT'
-                           ELSE 'Other'
-                       END as provider
+        # Fetch every requested conversation in one pass, grouped by conv_id
+        rows_by_conv = {}
+        unique_ids = list(dict.fromkeys(conv_ids))
+        for start in range(0, len(unique_ids), _SQL_BATCH_SIZE):
+            batch = unique_ids[start:start + _SQL_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            cursor = self.conn.execute(f"""
+                SELECT conv_id, title, role, content, date, ts,
+                       {self._provider} as provider
                 FROM docs 
-                WHERE conv_id = ?
-                ORDER BY ts, rowid
-            """, (conv_id,)).fetchall()
-            
+                WHERE conv_id IN ({placeholders})
+                ORDER BY conv_id, ts, rowid
+            """, batch)
+            for conv_id, group in groupby(cursor, key=itemgetter('conv_id')):
+                rows_by_conv[conv_id] = list(group)
+        
+        for conv_id in conv_ids:
+            rows = rows_by_conv.get(conv_id)
             if not rows:
                 continue
             
@@ -214,21 +269,13 @@ class ConversationAnalytics:
             
             # Extract key themes (simple approach)
             all_content = ' '.join(r['content'] for r in rows if r['content'])
-            themes = []
-            
-            # Common AI discussion themes
-            theme_patterns = {
-                'coding': r'\b(?:code|coding|programming|python|javascript|function|class|variable)\b',
-                'business': r'\b(?:business|strategy|market|revenue|customer|product|startup)\b',
-                'creative': r'\b(?:creative|design|art|writing|story|novel|poem|music)\b',
-                'technical': r'\b(?:technical|architecture|system|database|api|server|cloud)\b',
-                'analysis': r'\b(?:analysis|data|analytics|statistics|research|study|report)\b',
-                'planning': r'\b(?:plan|planning|strategy|roadmap|timeline|schedule|project)\b'
-            }
             
-            for theme, pattern in theme_patterns.items():
-                if re.search(pattern, all_content, re.IGNORECASE):
-                    themes.append(theme)
+            found = set()
+            for match in _THEMES_RE.finditer(all_content):
+                found.update(_THEMES_BY_WORD[match.group(0).lower()])
+                if len(found) == len(_THEME_WORDS):
+                    break
+            themes = [theme for theme in _THEME_WORDS if theme in found]
             
             summaries[conv_id] = {
                 'title': rows[0]['title'] or f"Conversation {conv_id}",
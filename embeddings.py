@@ -17,10 +17,11 @@ Usage:
 """
 
 import os
-import json
+import re
 import hashlib
+import sqlite3
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
 
 # Embedding dimensions for different models
@@ -31,6 +32,67 @@ EMBEDDING_DIMS = {
     "openai-large": 3072,       # text-embedding-3-large
 }
 
+# Max keys per "IN (...)" lookup against the embedding cache
+CACHE_LOOKUP_BATCH = 500
+
+# Connections kept alive per host by the API embedders
+HTTP_POOL_SIZE = 32
+
+
+def _http_session(headers: Dict[str, str]):
+    """Create a requests.Session with keep-alive pooling and retries."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    # Embedding POSTs are idempotent, so retry them on throttling and transient
+    # 5xx instead of failing the whole batch back to the indexer
+    retry = Retry(
+        total=5,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_maxsize=HTTP_POOL_SIZE, max_retries=retry))
+    session.headers.update(headers)
+    return session
+
+
+def _pack_batches(texts: List[str], max_items: int, max_tokens: int) -> List[List[str]]:
+    """Group texts into request-sized batches by count and estimated tokens."""
+    batches = []
+    current = []
+    current_tokens = 0
+    for text in texts:
+        # Rough estimate: 1 token ~= 4 characters
+        tokens = len(text) // 4 + 1
+        if current and (len(current) >= max_items or current_tokens + tokens > max_tokens):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _embed_batches(embed_batch, batches: List[List[str]], max_workers: int) -> List[List[float]]:
+    """Run embed_batch over batches concurrently, keeping input order."""
+    if len(batches) <= 1:
+        return embed_batch(batches[0]) if batches else []
+    
+    from concurrent.futures import ThreadPoolExecutor
+    
+    results = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+        for vectors in pool.map(embed_batch, batches):
+            results.extend(vectors)
+    return results
+
 
 class EmbeddingProvider(ABC):
     """Abstract base class for embedding providers."""
@@ -65,6 +127,19 @@ class LocalEmbedder(EmbeddingProvider):
         self._model = None
         self._cache_dir = cache_dir or Path.home() / ".cache" / "inchive" / "embeddings"
         self._cache_dir.mkdir(parents=True, exist_ok=True)
+        self._cache_conn = None
+    
+    def _cache_db(self) -> sqlite3.Connection:
+        """Open (once) the key/value store holding cached vectors."""
+        if self._cache_conn is None:
+            conn = sqlite3.connect(str(self._cache_dir / "emb.sqlite"), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            # Vectors are stored as float16 bytes (see _cache_put)
+            conn.execute("CREATE TABLE IF NOT EXISTS emb_f16 (k BLOB PRIMARY KEY, v BLOB)")
+            conn.commit()
+            self._cache_conn = conn
+        return self._cache_conn
     
     def _load_model(self):
         if self._model is None:
@@ -85,8 +160,37 @@ class LocalEmbedder(EmbeddingProvider):
     def model_name(self) -> str:
         return self._model_name
     
-    def _cache_key(self, text: str) -> str:
-        return hashlib.sha256(text.encode()).hexdigest()[:16]
+    def _cache_key(self, text: str) -> bytes:
+        # Non-cryptographic use: BLAKE2b is ~2x faster than SHA-256 here
+        return hashlib.blake2b(text.encode(), digest_size=8).digest()
+    
+    def _cache_get(self, keys: List[bytes]) -> Dict[bytes, List[float]]:
+        """Look up cached vectors for many keys with batched SELECTs."""
+        import numpy as np
+        
+        conn = self._cache_db()
+        found = {}
+        for start in range(0, len(keys), CACHE_LOOKUP_BATCH):
+            batch = keys[start:start + CACHE_LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            for k, v in conn.execute(f"SELECT k, v FROM emb_f16 WHERE k IN ({placeholders})", batch):
+                found[k] = np.frombuffer(v, dtype=np.float16).astype(np.float32).tolist()
+        return found
+    
+    def _cache_put(self, items: List[Tuple[bytes, Any]]) -> None:
+        """Store (key, vector) pairs as float16 bytes in one transaction.
+        
+        Half precision halves the cache size and read bandwidth; cosine
+        similarity is insensitive to the lost mantissa bits.
+        """
+        import numpy as np
+        
+        conn = self._cache_db()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO emb_f16 (k, v) VALUES (?, ?)",
+                [(k, np.asarray(vec, dtype=np.float16).tobytes()) for k, vec in items]
+            )
     
     def embed(self, texts: List[str], use_cache: bool = True) -> List[List[float]]:
         """Generate embeddings, optionally using disk cache."""
@@ -94,17 +198,20 @@ class LocalEmbedder(EmbeddingProvider):
         texts_to_embed = []
         indices_to_embed = []
         
-        # Check cache first
+        # Check cache first. Repeated texts share one lookup and one encode.
+        pending = {}
         if use_cache:
-            for i, text in enumerate(texts):
-                cache_file = self._cache_dir / f"{self._cache_key(text)}.json"
-                if cache_file.exists():
-                    with open(cache_file) as f:
-                        results.append(json.load(f))
-                else:
-                    results.append(None)
-                    texts_to_embed.append(text)
-                    indices_to_embed.append(i)
+            keys = [self._cache_key(text) for text in texts]
+            cached = self._cache_get(list(dict.fromkeys(keys)))
+            for i, (text, key) in enumerate(zip(texts, keys)):
+                vec = cached.get(key)
+                results.append(vec)
+                if vec is None:
+                    if key not in pending:
+                        pending[key] = []
+                        texts_to_embed.append(text)
+                        indices_to_embed.append(i)
+                    pending[key].append(i)
         else:
             texts_to_embed = texts
             indices_to_embed = list(range(len(texts)))
@@ -116,14 +223,19 @@ class LocalEmbedder(EmbeddingProvider):
             embeddings = model.encode(texts_to_embed, convert_to_numpy=True)
             
             for idx, embedding in zip(indices_to_embed, embeddings):
-                vec = embedding.tolist()
-                results[idx] = vec
-                
-                # Cache result
-                if use_cache:
-                    cache_file = self._cache_dir / f"{self._cache_key(texts[idx])}.json"
-                    with open(cache_file, "w") as f:
-                        json.dump(vec, f)
+                results[idx] = embedding.tolist()
+            
+            # Fill in duplicates of texts that were encoded above
+            for first, *rest in pending.values():
+                for idx in rest:
+                    results[idx] = list(results[first])
+            
+            # Cache results
+            if use_cache:
+                self._cache_put([
+                    (keys[idx], embedding)
+                    for idx, embedding in zip(indices_to_embed, embeddings)
+                ])
         
         return results
 
@@ -134,9 +246,23 @@ class CloudflareEmbedder(EmbeddingProvider):
     MODEL = "@cf/baai/bge-base-en-v1.5"
     API_URL = "https://api.cloudflare.com/client/v4/accounts/{account_id}/ai/run/{model}"
     
+    # Request sizing: texts per call, estimated tokens per call, calls in flight
+    BATCH_SIZE = 32
+    MAX_BATCH_TOKENS = 16000
+    MAX_WORKERS = 8
+    
     def __init__(self, account_id: str, api_token: str):
         self.account_id = account_id
         self.api_token = api_token
+        self._session = None
+    
+    def _get_session(self):
+        if self._session is None:
+            self._session = _http_session({
+                "Authorization": f"Bearer {self.api_token}",
+                "Content-Type": "application/json"
+            })
+        return self._session
     
     @property
     def dimensions(self) -> int:
@@ -148,18 +274,17 @@ class CloudflareEmbedder(EmbeddingProvider):
     
     def embed(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings via Cloudflare Workers AI API."""
-        import requests
-        
+        batches = _pack_batches(texts, self.BATCH_SIZE, self.MAX_BATCH_TOKENS)
+        return _embed_batches(self._embed_batch, batches, self.MAX_WORKERS)
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one request-sized batch."""
         url = self.API_URL.format(account_id=self.account_id, model=self.MODEL)
-        headers = {
-            "Authorization": f"Bearer {self.api_token}",
-            "Content-Type": "application/json"
-        }
         
         # Cloudflare accepts batch of texts
         payload = {"text": texts}
         
-        response = requests.post(url, headers=headers, json=payload)
+        response = self._get_session().post(url, json=payload)
         response.raise_for_status()
         
         result = response.json()
@@ -173,11 +298,25 @@ class CloudflareEmbedder(EmbeddingProvider):
 class OpenAIEmbedder(EmbeddingProvider):
     """OpenAI embedding using text-embedding-3-small."""
     
+    # Request sizing: texts per call, estimated tokens per call, calls in flight
+    BATCH_SIZE = 100
+    MAX_BATCH_TOKENS = 8000
+    MAX_WORKERS = 8
+    
     def __init__(self, api_key: Optional[str] = None, model: str = "text-embedding-3-small"):
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
         self._model = model
         if not self.api_key:
             raise ValueError("OpenAI API key required. Set OPENAI_API_KEY env var.")
+        self._session = None
+    
+    def _get_session(self):
+        if self._session is None:
+            self._session = _http_session({
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            })
+        return self._session
     
     @property
     def dimensions(self) -> int:
@@ -191,14 +330,13 @@ class OpenAIEmbedder(EmbeddingProvider):
     
     def embed(self, texts: List[str]) -> List[List[float]]:
         """Generate embeddings via OpenAI API."""
-        import requests
-        
-        response = requests.post(
+        batches = _pack_batches(texts, self.BATCH_SIZE, self.MAX_BATCH_TOKENS)
+        return _embed_batches(self._embed_batch, batches, self.MAX_WORKERS)
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed one request-sized batch."""
+        response = self._get_session().post(
             "https://api.openai.com/v1/embeddings",
-            headers={
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            },
             json={
                 "model": self._model,
                 "input": texts
@@ -251,14 +389,19 @@ def get_embedder(
 
 # Utility functions for chunking long texts
 
+_WORD_RE = re.compile(r"\S+")
+
 def chunk_text(text: str, max_tokens: int = 512, overlap: int = 50) -> List[str]:
     """
     Split text into overlapping chunks suitable for embedding.
     
     Uses simple word-based splitting. For production, consider
-    using tiktoken for accurate token counting.
+    using tiktoken for accurate token counting. Chunks are sliced
+    straight out of ``text`` using precomputed word offsets, so each
+    character is copied once per chunk instead of re-joining words.
     """
-    words = text.split()
+    spans = [m.span() for m in _WORD_RE.finditer(text)]
+    num_words = len(spans)
     chunks = []
     
     # Rough estimate: 1 token ~= 0.75 words
@@ -266,13 +409,12 @@ def chunk_text(text: str, max_tokens: int = 512, overlap: int = 50) -> List[str]
     overlap_words = int(overlap * 0.75)
     
     start = 0
-    while start < len(words):
+    while start < num_words:
         end = start + max_words
-        chunk = " ".join(words[start:end])
-        chunks.append(chunk)
+        chunks.append(text[spans[start][0]:spans[min(end, num_words) - 1][1]])
         start = end - overlap_words
         
-        if end >= len(words):
+        if end >= num_words:
             break
     
     return chunks
@@ -295,13 +437,16 @@ def embed_with_chunking(
     chunks = chunk_text(text, max_tokens=max_tokens)
     embeddings = embedder.embed(chunks)
     
-    # Average the embeddings
-    if len(embeddings) == 1:
-        avg_embedding = embeddings[0]
+    # Average the embeddings in one contiguous float32 matrix,
+    # accumulating in float64 so long documents don't lose precision
+    if len(embeddings) <= 1:
+        avg_embedding = embeddings[0] if embeddings else []
     else:
         import numpy as np
-        avg_embedding = np.mean(embeddings, axis=0).tolist()
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        avg_embedding = (matrix.sum(axis=0, dtype=np.float64) / len(matrix)).tolist()
     
+    # Chunk entries reference the embedder's vectors rather than copies
     return {
         "embedding": avg_embedding,
         "chunks": [
@@ -1,19 +1,165 @@
+import os
+import re
 import sqlite3
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Iterable, Tuple, List
+from typing import Callable, Iterable, Tuple, List, Optional
 from ingest import (
     parse_conversations, parse_projects, parse_users, 
     parse_chatgpt_conversations, parse_chatgpt_user,
-    parse_conversations_unified, parse_chatgpt_unified
+    parse_conversations_unified, parse_chatgpt_unified, flatten_conversation
 )
 from schema import SourceType
 from storage import KnowledgeStore
 
 
-def ensure_db(db_path: Path) -> sqlite3.Connection:
+# Docs buffered per executemany while building the legacy index
+INDEX_BATCH_SIZE = 2000
+
+# Docs written per transaction; each commit also checkpoints the WAL
+INDEX_COMMIT_ROWS = 50000
+
+# Conversations per KnowledgeStore batch insert, and per commit
+KG_BATCH_CONVS = 200
+KG_COMMIT_CONVS = 5000
+
+# Estimated tokens (chars / 4) per embedding batch; embedders are token-limited
+EMBED_BATCH_TOKENS = 8000
+
+# Provider classification of a docs row, derived from its source file name
+PROVIDER_SQL = (
+    "CASE WHEN source LIKE '%anthropic%' THEN 'Claude' "
+    "WHEN source LIKE '%chatgpt%' THEN 'ChatGPT' ELSE 'Other' END"
+)
+
+
+def ensure_provider_column(conn: sqlite3.Connection) -> None:
+    """Add the generated, indexed docs.provider column if it is missing.
+
+    Queries can then filter/group on ``provider`` instead of running two
+    ``LIKE '%...%'`` scans per row. SQLite only allows VIRTUAL generated
+    columns to be added with ALTER TABLE; the index stores the values.
+    """
+    cols = [r[1] for r in conn.execute("PRAGMA table_xinfo(docs)").fetchall()]
+    if "provider" not in cols:
+        conn.execute(f"ALTER TABLE docs ADD COLUMN provider TEXT GENERATED ALWAYS AS ({PROVIDER_SQL}) VIRTUAL")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_docs_provider ON {DOCS_INDEXES['idx_docs_provider']}")
+
+
+# External-content FTS: only the inverted index is stored, text is read
+# back from docs by rowid
+DOCS_FTS_SQL = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+        content, title, content='docs', content_rowid='rowid', tokenize='porter'
+    )
+"""
+
+# Triggers that keep docs_fts in step with docs: name -> definition
+DOCS_FTS_TRIGGERS = {
+    "docs_fts_ai": """
+        AFTER INSERT ON docs BEGIN
+            INSERT INTO docs_fts(rowid, content, title) VALUES (new.rowid, new.content, new.title);
+        END
+    """,
+    "docs_fts_ad": """
+        AFTER DELETE ON docs BEGIN
+            INSERT INTO docs_fts(docs_fts, rowid, content, title) VALUES ('delete', old.rowid, old.content, old.title);
+        END
+    """,
+    "docs_fts_au": """
+        AFTER UPDATE OF content, title ON docs BEGIN
+            INSERT INTO docs_fts(docs_fts, rowid, content, title) VALUES ('delete', old.rowid, old.content, old.title);
+            INSERT INTO docs_fts(rowid, content, title) VALUES (new.rowid, new.content, new.title);
+        END
+    """,
+}
+
+
+def ensure_docs_fts(conn: sqlite3.Connection) -> None:
+    """Create docs_fts and its sync triggers, indexing existing docs if new.
+
+    Older databases kept a full copy of every row in docs_fts; that table is
+    dropped and rebuilt as an external-content index.
+    """
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name='docs_fts'").fetchone()
+    if row and "content='docs'" not in (row[0] or ""):
+        conn.execute("DROP TABLE docs_fts")
+        row = None
+    conn.execute(DOCS_FTS_SQL)
+    for name, body in DOCS_FTS_TRIGGERS.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+    if row is None:
+        conn.execute("INSERT INTO docs_fts(docs_fts) VALUES('rebuild')")
+
+
+# Columns the old full-copy docs_fts indexed besides content and title.
+# "field:value" query tokens for them become WHERE clauses on docs (alias d)
+# instead of reaching MATCH, where the column no longer exists.
+DOCS_FIELD_FILTERS = {
+    "role": "d.role = ? COLLATE NOCASE",
+    "source": "instr(lower(d.source), lower(?)) > 0",
+    "conv_id": "d.conv_id = ?",
+    "date": "d.date LIKE ? || '%'",
+    "account": "d.account = ? COLLATE NOCASE",
+}
+_FIELD_FILTER_RE = re.compile(r'^(role|source|conv_id|date|account):"?([^"]*)"?$', re.IGNORECASE)
+
+
+def split_field_filters(query: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Split legacy field:value tokens out of a search query.
+
+    Returns the remaining FTS query and a list of (SQL condition, parameter)
+    pairs from DOCS_FIELD_FILTERS. Queries without such tokens come back
+    unchanged.
+    """
+    tokens = query.split()
+    terms = []
+    filters = []
+    for token in tokens:
+        m = _FIELD_FILTER_RE.match(token)
+        if m:
+            if m.group(2):
+                filters.append((DOCS_FIELD_FILTERS[m.group(1).lower()], m.group(2)))
+        else:
+            terms.append(token)
+    if len(terms) == len(tokens):
+        return query, []
+    return " ".join(terms), filters
+
+
+# Secondary b-tree indexes on docs: name -> "table(columns)"
+DOCS_INDEXES = {
+    "idx_docs_date": "docs(date)",
+    "idx_docs_account": "docs(account)",
+    "idx_docs_provider": "docs(provider, ts)",
+    # Covering indexes for the analytics scans and per-conversation reads
+    "idx_docs_ts_role_source": "docs(ts, role, source)",
+    "idx_docs_conv_ts": "docs(conv_id, ts)",
+}
+
+
+def create_docs_indexes(conn: sqlite3.Connection) -> None:
+    """Create DOCS_INDEXES that apply to this database.
+
+    idx_docs_provider needs the generated provider column, which SQLite
+    before 3.31 cannot add; it is skipped when the column is missing.
+    """
+    has_provider = "provider" in [r[1] for r in conn.execute("PRAGMA table_xinfo(docs)").fetchall()]
+    for name, columns in DOCS_INDEXES.items():
+        if name == "idx_docs_provider" and not has_provider:
+            continue
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}")
+
+
+def ensure_db(db_path: Path, initial_build: bool = False) -> sqlite3.Connection:
     db_path.parent.mkdir(parents=True, exist_ok=True)
     conn = sqlite3.connect(str(db_path))
+    # Page size and auto_vacuum only take effect on a new, empty file, so
+    # they must come before WAL mode and the first table
+    conn.execute("PRAGMA page_size=8192;")
+    conn.execute("PRAGMA auto_vacuum=NONE;")
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA synchronous=NORMAL;")
     conn.execute(
@@ -40,97 +186,160 @@ def ensure_db(db_path: Path) -> sqlite3.Connection:
             conn.commit()
     except Exception:
         pass
-    # Migration: ensure docs_fts has 'account' column, rebuild if needed
     try:
-        row = conn.execute("SELECT sql FROM sqlite_schema WHERE type='table' AND name='docs_fts'").fetchone()
-        if row and row[0] and ("account" not in row[0]):
-            conn.execute("DROP TABLE IF EXISTS docs_fts")
-            conn.commit()
-    except Exception:
-        pass
-    conn.execute(
-        """
-        CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
-            content, title, role, source, conv_id, ts, date, account, doc_id UNINDEXED, tokenize='porter'
-        )
-        """
-    )
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_date ON docs(date)")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_account ON docs(account)")
-    # If FTS was recreated, repopulate from docs when empty
-    try:
-        fts_count = conn.execute("SELECT COUNT(*) FROM docs_fts").fetchone()[0]
-        if fts_count == 0:
-            conn.execute(
-                """
-                INSERT INTO docs_fts(rowid, content, title, role, source, conv_id, ts, date, account, doc_id)
-                SELECT rowid, content, title, role, source, conv_id, CAST(ts AS TEXT), date, COALESCE(account, 'default'), id
-                FROM docs
-                """
-            )
+        ensure_provider_column(conn)
     except Exception:
         pass
+    if initial_build:
+        # Bulk load: leave FTS and secondary indexes to finish_bulk_load(),
+        # which builds each in one pass instead of per-row maintenance
+        for name in DOCS_FTS_TRIGGERS:
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+        conn.execute("DROP TABLE IF EXISTS docs_fts")
+        for name in DOCS_INDEXES:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+        conn.commit()
+        return conn
+    ensure_docs_fts(conn)
+    create_docs_indexes(conn)
     conn.commit()
     return conn
 
 
+def begin_bulk_load(conn: sqlite3.Connection) -> None:
+    """Switch to write-optimized PRAGMAs for a from-scratch index build.
+
+    Journaling and fsync are turned off, so a crash mid-build can leave the
+    file corrupt; the recovery strategy is to rerun the indexer.
+    """
+    conn.executescript(
+        "PRAGMA journal_mode=OFF;"
+        "PRAGMA synchronous=OFF;"
+        "PRAGMA temp_store=MEMORY;"
+        "PRAGMA cache_size=-262144;"
+        "PRAGMA locking_mode=EXCLUSIVE;"
+        "PRAGMA mmap_size=268435456;"
+    )
+
+
+def end_bulk_load(conn: sqlite3.Connection) -> None:
+    """Restore the steady-state WAL PRAGMAs after begin_bulk_load()."""
+    conn.executescript(
+        "PRAGMA journal_mode=WAL;"
+        "PRAGMA synchronous=NORMAL;"
+        "PRAGMA locking_mode=NORMAL;"
+    )
+
+
+def finish_bulk_load(conn: sqlite3.Connection) -> None:
+    """Build docs_fts and the secondary indexes after an initial_build load."""
+    with conn:
+        ensure_docs_fts(conn)
+        create_docs_indexes(conn)
+    # Merge the FTS5 segments written by the bulk insert
+    with conn:
+        conn.execute("INSERT INTO docs_fts(docs_fts) VALUES('optimize')")
+
+
+# Rows sampled per index by ANALYZE; keeps it quick on multi-GB indexes
+ANALYZE_LIMIT = 1000
+
+
+def refresh_stats(conn: sqlite3.Connection) -> None:
+    """Refresh the planner statistics after a (re)build."""
+    conn.execute(f"PRAGMA analysis_limit={ANALYZE_LIMIT}")
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
 def ts_to_date(ts):
     if not ts:
         return None
     try:
-        dt = datetime.fromtimestamp(ts, tz=timezone.utc)
-        return dt.strftime('%Y-%m-%d')
+        return _day_to_date(int(ts // 86400))
     except Exception:
         return None
 
 
-def add_doc(conn: sqlite3.Connection, *, id, conv_id, title, role, ts, source, content, account: str) -> None:
-    date_str = ts_to_date(ts)
-    conn.execute(
-        """INSERT OR REPLACE INTO docs(id, conv_id, title, role, ts, date, source, content, account)
-            VALUES (?,?,?,?,?,?,?,?,?)""",
-        (id, conv_id, title, role, ts or 0.0, date_str, source, content or "", account or "default"),
-    )
-    conn.execute(
-        """INSERT INTO docs_fts(rowid, content, title, role, source, conv_id, ts, date, account, doc_id)
-            VALUES ((SELECT rowid FROM docs WHERE id=?),?,?,?,?,?,?,?,?,?)""",
-        (id, content or "", title or "", role or "", source or "", conv_id or "", str(ts or 0.0), date_str or "", account or "default", id),
+# Messages cluster on relatively few days, so format each UTC day once
+@lru_cache(maxsize=8192)
+def _day_to_date(day: int) -> str:
+    return datetime.fromtimestamp(day * 86400, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def add_doc(conn: sqlite3.Connection, doc: dict, account: str) -> None:
+    add_docs_batch(conn, [doc], account)
+
+
+def add_docs_batch(conn: sqlite3.Connection, docs: List[dict], account: str) -> None:
+    """Insert or update many parsed docs with one executemany.
+
+    Existing ids are updated in place so their rowid, and with it the
+    docs_fts entry maintained by the triggers, stays valid. Re-indexed docs
+    whose text is unchanged are skipped without writing anything.
+    """
+    account = account or "default"
+    doc_rows = [
+        (doc["id"], doc["conv_id"], doc["title"], doc["role"], doc["ts"] or 0.0, ts_to_date(doc["ts"]),
+         doc["source"], doc["content"] or "", account)
+        for doc in docs
+    ]
+    conn.executemany(
+        """INSERT INTO docs(id, conv_id, title, role, ts, date, source, content, account)
+            VALUES (?,?,?,?,?,?,?,?,?)
+            ON CONFLICT(id) DO UPDATE SET
+                conv_id=excluded.conv_id, title=excluded.title, role=excluded.role, ts=excluded.ts,
+                date=excluded.date, source=excluded.source, content=excluded.content, account=excluded.account
+            WHERE docs.content IS NOT excluded.content OR docs.title IS NOT excluded.title""",
+        doc_rows,
     )
 
 
-def _parsers_for_export(export_dir: Path) -> Iterable[Tuple[str, Iterable[dict]]]:
+def _export_files(export_dir: Path) -> List[Tuple[str, Callable[[Path], Iterable[dict]], Path]]:
+    """List (source name, parser, path) for every indexable file in an export."""
+    files = []
     # Look for all conversation files (conversations.json, conversations 2.json, etc.)
-    import glob
     conversation_files = list(export_dir.glob("conversations*.json"))
     
     for conv_file in conversation_files:
-        # Try to detect format by reading a small sample
-        try:
-            with open(conv_file, 'r', encoding='utf-8') as f:
-                sample = f.read(2048)  # Read first 2KB for better detection
-                if '"mapping"' in sample and '"author"' in sample:
-                    # Looks like ChatGPT format
-                    yield (f"chatgpt.{conv_file.name}", parse_chatgpt_conversations(conv_file))
-                else:
-                    # Assume Anthropic format
-                    yield (f"anthropic.{conv_file.name}", parse_conversations(conv_file))
-        except Exception:
-            # Fallback to Anthropic format
-            yield (f"anthropic.{conv_file.name}", parse_conversations(conv_file))
+        if _detect_format(conv_file) == "chatgpt":
+            files.append((f"chatgpt.{conv_file.name}", parse_chatgpt_conversations, conv_file))
+        else:
+            # Assume Anthropic format
+            files.append((f"anthropic.{conv_file.name}", parse_conversations, conv_file))
     
     # Anthropic-specific files
     p = export_dir / "projects.json"
     if p.exists():
-        yield ("anthropic.projects.json", parse_projects(p))
+        files.append(("anthropic.projects.json", parse_projects, p))
     
     # Handle both user file formats
     p = export_dir / "users.json"
     if p.exists():
-        yield ("anthropic.users.json", parse_users(p))
+        files.append(("anthropic.users.json", parse_users, p))
     
     p = export_dir / "user.json"  # ChatGPT uses user.json
     if p.exists():
-        yield ("chatgpt.user.json", parse_chatgpt_user(p))
+        files.append(("chatgpt.user.json", parse_chatgpt_user, p))
+    return files
+
+
+def _parsers_for_export(export_dir: Path) -> Iterable[Tuple[str, Iterable[dict]]]:
+    for name, parse, path in _export_files(export_dir):
+        yield (name, parse(path))
+
+
+# Unified parser behind each legacy conversation parser, for the fused build
+_UNIFIED_PARSERS = {
+    parse_conversations: (parse_conversations_unified, "anthropic.conversations.json"),
+    parse_chatgpt_conversations: (parse_chatgpt_unified, "chatgpt.conversations.json"),
+}
+
+
+def _parse_file_worker(task: Tuple[Callable[[Path], Iterable[dict]], Path]) -> List[dict]:
+    """Run one parser to completion in a worker process."""
+    parse, path = task
+    return list(parse(path))
 
 
 def build_index(export_dir: Path, out_dir: Path) -> Path:
@@ -141,19 +350,89 @@ def build_index(export_dir: Path, out_dir: Path) -> Path:
     return build_index_multi([(export_dir.name or "default", export_dir)], out_dir)
 
 
-def build_index_multi(sources: List[Tuple[str, Path]], out_dir: Path) -> Path:
+def _commit_chunk(conn: sqlite3.Connection, checkpoint: bool) -> None:
+    """Commit the open transaction and start the next one.
+
+    With ``checkpoint`` the WAL is also truncated, so it stays bounded by
+    one chunk of rows instead of growing for the whole build.
+    """
+    conn.execute("COMMIT")
+    if checkpoint:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("BEGIN IMMEDIATE")
+
+
+def build_index_multi(sources: List[Tuple[str, Path]], out_dir: Path, bulk: bool = True,
+                      workers: int = 1) -> Path:
+    """Build out_dir/chatgpt.db from several (account, export_dir) sources.
+
+    With ``bulk`` (the default) the build trades durability for speed: FTS and
+    secondary indexes are rebuilt at the end and journaling is switched off
+    while loading, so an interrupted build must be rerun. Pass ``bulk=False``
+    when updating a database that other connections are using.
+
+    By default each export file is parsed inline and streamed into the
+    database. With ``workers > 1`` files are parsed in that many processes
+    while this process does all the writes; each parsed file is then held
+    in memory until written, so this only pays off for several large files.
+    """
     db_path = out_dir / "chatgpt.db"
-    conn = ensure_db(db_path)
+    tasks = [
+        (account, name, parse, path)
+        for account, export_dir in sources
+        for name, parse, path in _export_files(export_dir)
+    ]
+    workers = min(workers, len(tasks))
+    
+    conn = ensure_db(db_path, initial_build=bulk)
+    if bulk:
+        begin_bulk_load(conn)
+        # Map enough of the file for the whole build (roughly 3x the exports)
+        est_bytes = sum(path.stat().st_size for _, _, _, path in tasks) * 3
+        if est_bytes > 268435456:
+            conn.execute(f"PRAGMA mmap_size={est_bytes}")
     total = 0
-    with conn:
-        for account, export_dir in sources:
-            for name, gen in _parsers_for_export(export_dir):
-                print(f"Processing {account}:{name}...")
-                for doc in gen:
-                    add_doc(conn, **{k: doc[k] for k in ("id","conv_id","title","role","ts","source","content")}, account=account)
-                    total += 1
-                    if total % 1000 == 0:
-                        print(f"  Processed {total:,} docs...")
+    uncommitted = 0
+    # Explicit transactions: BEGIN IMMEDIATE takes the write lock up front
+    conn.isolation_level = None
+    executor = None
+    try:
+        if workers > 1:
+            executor = ProcessPoolExecutor(max_workers=workers)
+            # map() yields in task order, so rows are written deterministically
+            results = executor.map(_parse_file_worker, [(parse, path) for _, _, parse, path in tasks], chunksize=1)
+        else:
+            results = (parse(path) for _, _, parse, path in tasks)
+        conn.execute("BEGIN IMMEDIATE")
+        for (account, name, _, _), docs in zip(tasks, results):
+            print(f"Processing {account}:{name}...")
+            batch = []
+            for doc in docs:
+                batch.append(doc)
+                total += 1
+                if len(batch) >= INDEX_BATCH_SIZE:
+                    add_docs_batch(conn, batch, account)
+                    uncommitted += len(batch)
+                    batch = []
+                    if uncommitted >= INDEX_COMMIT_ROWS:
+                        _commit_chunk(conn, checkpoint=not bulk)
+                        uncommitted = 0
+                if total % 1000 == 0:
+                    print(f"  Processed {total:,} docs...")
+            add_docs_batch(conn, batch, account)
+            uncommitted += len(batch)
+        conn.execute("COMMIT")
+    finally:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        if executor is not None:
+            # All results are consumed unless the build failed; don't wait then
+            executor.shutdown(wait=False)
+    if bulk:
+        print("Building full-text index...")
+        finish_bulk_load(conn)
+        end_bulk_load(conn)
+    refresh_stats(conn)
     print(f"Indexed {total:,} docs into {db_path}")
     conn.close()
     return db_path
@@ -164,16 +443,33 @@ def build_index_multi(sources: List[Tuple[str, Path]], out_dir: Path) -> Path:
 def _detect_format(conv_file: Path) -> str:
     """Detect if a conversations file is ChatGPT or Claude format."""
     try:
-        with open(conv_file, 'r', encoding='utf-8') as f:
-            sample = f.read(2048)
-            if '"mapping"' in sample and '"author"' in sample:
-                return "chatgpt"
-            return "claude"
-    except Exception:
+        st = os.stat(conv_file)
+    except OSError:
+        return "claude"
+    return _detect_format_cached(str(conv_file), st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=None)
+def _detect_format_cached(path: str, mtime_ns: int, size: int) -> str:
+    # Keyed on mtime/size so a replaced export is sniffed again; the legacy,
+    # knowledge graph and embedding passes otherwise each reopen every file
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            # First 2KB is enough to tell the formats apart; match the raw
+            # bytes, since both markers are ASCII
+            sample = os.read(fd, 2048)
+        finally:
+            os.close(fd)
+    except OSError:
         return "claude"
+    if b'"mapping"' in sample and b'"author"' in sample:
+        return "chatgpt"
+    return "claude"
 
 
-def build_knowledge_graph(sources: List[Tuple[str, Path]], out_dir: Path) -> Path:
+def build_knowledge_graph(sources: List[Tuple[str, Path]], out_dir: Path, bulk: bool = True,
+                          workers: Optional[int] = None) -> Path:
     """Build a Knowledge Graph database from export files.
     
     This is the new indexer that uses the unified schema and creates
@@ -182,12 +478,17 @@ def build_knowledge_graph(sources: List[Tuple[str, Path]], out_dir: Path) -> Pat
     Args:
         sources: List of (account_name, export_dir) tuples
         out_dir: Output directory for the database
+        bulk: Load with journaling off (see begin_bulk_load)
+        workers: Processes parsing conversations (default: CPU count)
     
     Returns:
         Path to the created database
     """
+    workers = workers or os.cpu_count() or 1
     db_path = out_dir / "knowledge.db"
     store = KnowledgeStore(db_path)
+    if bulk:
+        begin_bulk_load(store.conn)
     
     total_convs = 0
     total_turns = 0
@@ -201,23 +502,36 @@ def build_knowledge_graph(sources: List[Tuple[str, Path]], out_dir: Path) -> Pat
             print(f"Processing {account}:{conv_file.name} ({fmt} format)...")
             
             if fmt == "chatgpt":
-                parser = parse_chatgpt_unified(conv_file)
+                parser = parse_chatgpt_unified(conv_file, workers)
             else:
-                parser = parse_conversations_unified(conv_file)
+                parser = parse_conversations_unified(conv_file, workers)
             
+            convs = []
             for conv in parser:
-                store.add_conversation(conv, account)
+                convs.append(conv)
                 total_convs += 1
                 total_turns += len(conv.turns)
+                if len(convs) >= KG_BATCH_CONVS:
+                    store.add_conversations_batch(convs, account)
+                    convs = []
                 
-                if total_convs % 100 == 0:
+                if total_convs % KG_COMMIT_CONVS == 0:
                     print(f"  Processed {total_convs:,} conversations, {total_turns:,} turns...")
                     store.commit()
+            store.add_conversations_batch(convs, account)
         
         # TODO: Handle projects.json and users.json as special node types
     
     store.commit()
+    _print_kg_stats(store, db_path)
     
+    if bulk:
+        end_bulk_load(store.conn)
+    store.close()
+    return db_path
+
+
+def _print_kg_stats(store: KnowledgeStore, db_path: Path) -> None:
     stats = store.get_stats()
     print(f"\nKnowledge Graph built at {db_path}")
     print(f"  Conversations: {stats['conversations']:,}")
@@ -226,9 +540,6 @@ def build_knowledge_graph(sources: List[Tuple[str, Path]], out_dir: Path) -> Pat
     print(f"  Edges: {stats['edges']:,}")
     print(f"  Code blocks: {stats['code_blocks']:,}")
     print(f"  Links: {stats['links']:,}")
-    
-    store.close()
-    return db_path
 
 
 def build_dual_index(sources: List[Tuple[str, Path]], out_dir: Path) -> Tuple[Path, Path]:
@@ -243,11 +554,94 @@ def build_dual_index(sources: List[Tuple[str, Path]], out_dir: Path) -> Tuple[Pa
 
 # Vector embedding indexing
 
+def _embedding_items(conv, account: str) -> Iterable[Tuple[str, dict]]:
+    """Yield (text, metadata) for each turn of a conversation worth embedding."""
+    for turn in conv.turns:
+        # Skip very short content
+        if len(turn.content.strip()) < 20:
+            continue
+        
+        yield turn.content[:2000], {  # Truncate long content
+            "id": turn.id,
+            "conv_id": conv.id,
+            "title": conv.title,
+            "role": turn.role,
+            "timestamp": turn.timestamp,
+            "source": conv.source.value,
+            "account": account
+        }
+
+
+class _EmbeddingBatcher:
+    """Collect turn texts and embed them in batches.
+
+    A batch is sent once it holds ``batch_size`` texts or EMBED_BATCH_TOKENS
+    estimated tokens. The embedder runs on a background thread while the next
+    batch is collected; vectors are inserted on the calling thread, which owns
+    the vector store's SQLite connection.
+    """
+    
+    def __init__(self, embedder, vector_store, batch_size: int):
+        self.embedder = embedder
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.total = 0
+        self._texts = []
+        self._metadata = []
+        self._tokens = 0
+        self._pending = None
+        self._executor = ThreadPoolExecutor(max_workers=1)
+    
+    def add(self, text: str, meta: dict) -> bool:
+        """Queue one text; returns True if this sent a batch."""
+        self._texts.append(text)
+        self._metadata.append(meta)
+        self._tokens += len(text) // 4 + 1
+        if len(self._texts) >= self.batch_size or self._tokens >= EMBED_BATCH_TOKENS:
+            self.flush()
+            return True
+        return False
+    
+    def flush(self) -> None:
+        """Store the batch in flight, then start embedding the queued one."""
+        self._store_pending()
+        if not self._texts:
+            return
+        # Hand the lists to the worker; they can't be reused while it runs
+        texts, metadata = self._texts, self._metadata
+        self._texts, self._metadata, self._tokens = [], [], 0
+        self._pending = (self._executor.submit(self.embedder.embed, texts), metadata)
+    
+    def close(self) -> int:
+        """Embed everything still queued; returns the number of vectors stored."""
+        self.flush()
+        self._store_pending()
+        self._executor.shutdown()
+        return self.total
+    
+    def _store_pending(self) -> None:
+        if self._pending is None:
+            return
+        future, metadata = self._pending
+        self._pending = None
+        try:
+            embeddings = future.result()
+            items = [
+                (meta["id"], emb, meta)
+                for emb, meta in zip(embeddings, metadata)
+            ]
+            self.vector_store.insert_batch(items)
+            self.total += len(items)
+        except Exception as e:
+            print(f"  Warning: batch embedding failed: {e}")
+
+
 def build_embeddings(
     sources: List[Tuple[str, Path]], 
     out_dir: Path,
     provider: str = "local",
     batch_size: int = 32,
+    workers: Optional[int] = None,
     **provider_kwargs
 ) -> Path:
     """
@@ -258,6 +652,7 @@ def build_embeddings(
         out_dir: Output directory for the vector database
         provider: Embedding provider ("local", "cloudflare", "openai")
         batch_size: Number of texts to embed at once
+        workers: Processes parsing conversations (default: CPU count)
         **provider_kwargs: Provider-specific arguments
     
     Returns:
@@ -266,6 +661,8 @@ def build_embeddings(
     from embeddings import get_embedder
     from vector_store import get_vector_store
     
+    workers = workers or os.cpu_count() or 1
+    
     # Initialize embedder
     embedder = get_embedder(provider, **provider_kwargs)
     print(f"Using {provider} embedder: {embedder.model_name} ({embedder.dimensions}D)")
@@ -278,28 +675,7 @@ def build_embeddings(
         dimensions=embedder.dimensions
     )
     
-    total_embedded = 0
-    batch_texts = []
-    batch_metadata = []
-    
-    def flush_batch():
-        nonlocal total_embedded, batch_texts, batch_metadata
-        if not batch_texts:
-            return
-        
-        try:
-            embeddings = embedder.embed(batch_texts)
-            items = [
-                (meta["id"], emb, meta)
-                for emb, meta in zip(embeddings, batch_metadata)
-            ]
-            vector_store.insert_batch(items)
-            total_embedded += len(items)
-        except Exception as e:
-            print(f"  Warning: batch embedding failed: {e}")
-        
-        batch_texts = []
-        batch_metadata = []
+    batcher = _EmbeddingBatcher(embedder, vector_store, batch_size)
     
     for account, export_dir in sources:
         conversation_files = list(export_dir.glob("conversations*.json"))
@@ -309,34 +685,17 @@ def build_embeddings(
             print(f"Embedding {account}:{conv_file.name} ({fmt} format)...")
             
             if fmt == "chatgpt":
-                parser = parse_chatgpt_unified(conv_file)
+                parser = parse_chatgpt_unified(conv_file, workers)
             else:
-                parser = parse_conversations_unified(conv_file)
+                parser = parse_conversations_unified(conv_file, workers)
             
             for conv in parser:
-                for turn in conv.turns:
-                    # Skip very short content
-                    if len(turn.content.strip()) < 20:
-                        continue
-                    
-                    batch_texts.append(turn.content[:2000])  # Truncate long content
-                    batch_metadata.append({
-                        "id": turn.id,
-                        "conv_id": conv.id,
-                        "title": conv.title,
-                        "role": turn.role,
-                        "timestamp": turn.timestamp,
-                        "source": conv.source.value,
-                        "account": account
-                    })
-                    
-                    if len(batch_texts) >= batch_size:
-                        flush_batch()
-                        if total_embedded % 500 == 0:
-                            print(f"  Embedded {total_embedded:,} turns...")
+                for text, meta in _embedding_items(conv, account):
+                    if batcher.add(text, meta) and batcher.total % 500 == 0:
+                        print(f"  Embedded {batcher.total:,} turns...")
     
     # Final flush
-    flush_batch()
+    batcher.close()
     
     print(f"\nVector embeddings built at {vector_db_path}")
     print(f"  Total vectors: {vector_store.count():,}")
@@ -348,32 +707,112 @@ def build_full_index(
     sources: List[Tuple[str, Path]], 
     out_dir: Path,
     embed_provider: str = "local",
+    batch_size: int = 32,
+    workers: Optional[int] = None,
     **embed_kwargs
 ) -> dict:
     """
     Build complete index: legacy FTS + Knowledge Graph + Vector embeddings.
     
+    Each export file is parsed once and every conversation is fanned out to
+    all three databases, instead of running the three builders back to back.
+    
     Args:
         sources: List of (account_name, export_dir) tuples
         out_dir: Output directory
         embed_provider: Embedding provider for vectors
+        batch_size: Number of texts to embed at once
+        workers: Processes parsing conversations (default: CPU count)
         **embed_kwargs: Embedding provider arguments
     
     Returns:
         Dict with paths to all created databases
     """
+    from embeddings import get_embedder
+    from vector_store import get_vector_store
+    
     print("=" * 60)
     print("Building Full Inchive Index")
     print("=" * 60)
     
-    print("\n[1/3] Building Legacy FTS Index...")
-    legacy_path = build_index_multi(sources, out_dir)
+    workers = workers or os.cpu_count() or 1
+    legacy_path = out_dir / "chatgpt.db"
+    conn = ensure_db(legacy_path, initial_build=True)
+    begin_bulk_load(conn)
     
-    print("\n[2/3] Building Knowledge Graph...")
-    kg_path = build_knowledge_graph(sources, out_dir)
+    kg_path = out_dir / "knowledge.db"
+    store = KnowledgeStore(kg_path)
+    begin_bulk_load(store.conn)
+    
+    embedder = get_embedder(embed_provider, **embed_kwargs)
+    print(f"Using {embed_provider} embedder: {embedder.model_name} ({embedder.dimensions}D)")
+    vector_path = out_dir / "vectors.db"
+    vector_store = get_vector_store(
+        "sqlite", 
+        db_path=vector_path,
+        dimensions=embedder.dimensions
+    )
+    
+    total_docs = 0
+    total_convs = 0
+    docs = []
+    batcher = _EmbeddingBatcher(embedder, vector_store, batch_size)
+    
+    for account, export_dir in sources:
+        for name, parse, path in _export_files(export_dir):
+            print(f"Processing {account}:{name}...")
+            if parse not in _UNIFIED_PARSERS:
+                # projects.json / users.json only feed the legacy index
+                extra_docs = list(parse(path))
+                with conn:
+                    add_docs_batch(conn, extra_docs, account)
+                total_docs += len(extra_docs)
+                continue
+            
+            parse_unified, source = _UNIFIED_PARSERS[parse]
+            convs = []
+            for conv in parse_unified(path, workers):
+                docs.extend(flatten_conversation(conv, source))
+                if len(docs) >= INDEX_BATCH_SIZE:
+                    with conn:
+                        add_docs_batch(conn, docs, account)
+                    total_docs += len(docs)
+                    docs = []
+                
+                convs.append(conv)
+                total_convs += 1
+                if len(convs) >= KG_BATCH_CONVS:
+                    store.add_conversations_batch(convs, account)
+                    convs = []
+                if total_convs % KG_COMMIT_CONVS == 0:
+                    print(f"  Processed {total_convs:,} conversations...")
+                    store.commit()
+                
+                for text, meta in _embedding_items(conv, account):
+                    batcher.add(text, meta)
+            
+            with conn:
+                add_docs_batch(conn, docs, account)
+            total_docs += len(docs)
+            docs = []
+            store.add_conversations_batch(convs, account)
+    
+    batcher.close()
+    
+    print("Building full-text index...")
+    finish_bulk_load(conn)
+    end_bulk_load(conn)
+    refresh_stats(conn)
+    conn.close()
+    print(f"Indexed {total_docs:,} docs into {legacy_path}")
+    
+    store.commit()
+    _print_kg_stats(store, kg_path)
+    end_bulk_load(store.conn)
+    store.close()
     
-    print("\n[3/3] Building Vector Embeddings...")
-    vector_path = build_embeddings(sources, out_dir, provider=embed_provider, **embed_kwargs)
+    print(f"\nVector embeddings built at {vector_path}")
+    print(f"  Total vectors: {vector_store.count():,}")
     
     print("\n" + "=" * 60)
     print("Index Complete!")
@@ -387,5 +826,3 @@ def build_full_index(
         "knowledge_graph": kg_path,
         "vectors": vector_path
     }
-
-
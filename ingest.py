@@ -1,200 +1,358 @@
-import json, re, html, time
+import json, re, html, time, hashlib, mmap, sys
+from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Generator, Dict, Any, List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Generator, Dict, Any, Iterable, List, Optional
 from schema import Conversation, Turn, SourceType, Entity, Artifact
 
+# Fractional seconds that fromisoformat() can't parse (e.g. more than 6 digits)
+_FRACTION_RE = re.compile(r"\.(\d+)(Z|[+-]\d\d:\d\d)$")
+
+# Optional C ISO-8601 parser; handles long fractions and offsets in one pass
+try:
+    from ciso8601 import parse_datetime as _ciso_parse_datetime
+except ImportError:
+    _ciso_parse_datetime = None
+
+# Parsed ISO timestamps; messages in a burst share the same strings
+_TS_CACHE: Dict[str, float] = {}
+
+def _parse_iso(ts_iso: str) -> float:
+    """Epoch seconds for an ISO-8601 string, or 0.0 if it can't be parsed."""
+    ts_val = _TS_CACHE.get(ts_iso)
+    if ts_val is not None:
+        return ts_val
+    ts_val = 0.0
+    try:
+        dt = None
+        if _ciso_parse_datetime is not None:
+            try:
+                dt = _ciso_parse_datetime(ts_iso)
+            except ValueError:
+                pass
+        if dt is None:
+            try:
+                dt = datetime.fromisoformat(ts_iso.replace("Z", "+00:00"))
+            except Exception:
+                ts_iso2 = _FRACTION_RE.sub(r"\2", ts_iso)
+                dt = datetime.fromisoformat(ts_iso2.replace("Z", "+00:00"))
+        ts_val = dt.timestamp()
+    except Exception:
+        pass
+    if len(_TS_CACHE) >= 100_000:
+        _TS_CACHE.clear()
+    _TS_CACHE[ts_iso] = ts_val
+    return ts_val
+
+def _load_json(p: Path) -> Any:
+    """Parse a whole JSON file, with orjson when it is installed.
+
+    orjson reads straight from a memory map of the file, so no copy of the
+    raw bytes is made on the Python heap.
+    """
+    with open(p, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        try:
+            import orjson
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+        except (ImportError, ValueError):
+            # No orjson, or input it rejects (e.g. invalid UTF-8): decode leniently
+            return json.loads(mm[:].decode("utf-8", errors="ignore"))
+
+def _stable_hash(text: str) -> str:
+    """Short content hash that, unlike hash(), is the same in every process."""
+    return hashlib.blake2b(text.encode("utf-8", "replace"), digest_size=8).hexdigest()
+
+# Characters of a message's text that go into a fallback conversation id
+_FINGERPRINT_TEXT_LEN = 200
+
+def _anthropic_fingerprint(conv_data: Dict[str, Any]) -> str:
+    """Bounded fingerprint of an Anthropic conversation that has no uuid.
+
+    Metadata plus the first and last message (id, time, leading text), so
+    similar untitled conversations differ without serializing them whole.
+    """
+    msgs = conv_data.get("chat_messages") or []
+    ends = [
+        (m.get("uuid"), m.get("created_at"), (m.get("text") or "")[:_FINGERPRINT_TEXT_LEN])
+        for m in msgs[:1] + msgs[-1:]
+    ]
+    return repr((conv_data.get("name"), conv_data.get("created_at"), conv_data.get("updated_at"),
+                 len(msgs), ends))
+
+def _chatgpt_fingerprint(conv_data: Dict[str, Any]) -> str:
+    """Bounded fingerprint of a ChatGPT conversation that has no id (see above)."""
+    mapping = conv_data.get("mapping") or {}
+    ends = []
+    if mapping:
+        first, last = next(iter(mapping)), next(reversed(mapping))
+        for node_id in ([first] if first == last else [first, last]):
+            message = (mapping[node_id] or {}).get("message") or {}
+            parts = (message.get("content") or {}).get("parts") or []
+            ends.append((node_id, message.get("create_time"), str(parts[0])[:_FINGERPRINT_TEXT_LEN] if parts else ""))
+    return repr((conv_data.get("title"), conv_data.get("create_time"), conv_data.get("update_time"),
+                 len(mapping), ends))
+
+# Longer texts are rarely repeated verbatim; keep them out of the cache
+_NORM_CACHE_MAX_LEN = 2048
+
+def _norm_text_uncached(x: str) -> str:
+    # Most message bodies contain no entities; skip the unescape scan for them
+    if "&" in x:
+        x = html.unescape(x)
+    # split()/join collapses whitespace runs and strips, faster than re.sub
+    return " ".join(x.split())
+
+# Short messages ("Thanks!", "continue", empty text) repeat constantly
+_norm_text_cached = lru_cache(maxsize=8192)(_norm_text_uncached)
+
 def _norm_text(x: Any) -> str:
     if x is None:
         return ""
-    x = html.unescape(str(x))
-    x = re.sub(r"\s+", " ", x).strip()
-    return x
+    x = str(x)
+    if len(x) > _NORM_CACHE_MAX_LEN:
+        return _norm_text_uncached(x)
+    return _norm_text_cached(x)
 
-def parse_conversations_unified(p: Path) -> Generator[Conversation, None, None]:
-    """Yield Conversation objects from Anthropic conversations.json."""
-    raw = json.loads(p.read_text(encoding="utf-8", errors="ignore"))
-    if not isinstance(raw, list):
-        return
+def _intern(x: Any) -> Any:
+    """Share one object per distinct role string across every Turn."""
+    return sys.intern(x) if type(x) is str else x
+
+def _iter_json_array(p: Path) -> Generator[Any, None, None]:
+    """Yield the items of a top-level JSON array one at a time.
 
-    for conv_data in raw:
+    Streams with ijson (C backend when available) so multi-GB exports never
+    sit in memory whole; falls back to loading the file whole without it.
+    """
+    try:
         try:
-            conv_id = conv_data.get("uuid") or conv_data.get("id") or Conversation.generate_id(json.dumps(conv_data))
-            title = conv_data.get("name") or conv_data.get("summary") or "Anthropic Conversation"
-            created_at = 0.0
-            
-            # Try to find earliest timestamp
-            msgs = conv_data.get("chat_messages") or []
-            turns = []
-            
-            for i, m in enumerate(msgs):
-                role = m.get("sender") or m.get("role") or "user"
-                content = m.get("text") or ""
-                
-                # Parse timestamp
-                ts_iso = None
-                content_blocks = m.get("content")
-                if isinstance(content_blocks, list) and content_blocks:
-                    block0 = content_blocks[0]
-                    ts_iso = block0.get("start_timestamp") or block0.get("stop_timestamp")
-                ts_iso = ts_iso or m.get("created_at") or m.get("updated_at")
-                
-                ts_val = 0.0
-                if isinstance(ts_iso, str):
-                    try:
-                        from datetime import datetime
-                        try:
-                            dt = datetime.fromisoformat(ts_iso.replace("Z", "+00:00"))
-                        except Exception:
-                            ts_iso2 = re.sub(r"\.(\d+)(Z|[+-]\d\d:\d\d)$", r"\2", ts_iso)
-                            dt = datetime.fromisoformat(ts_iso2.replace("Z", "+00:00"))
-                        ts_val = dt.timestamp()
-                    except Exception:
-                        pass
-                
-                if i == 0 and ts_val > 0:
-                    created_at = ts_val
-
-                turn_id = f"{conv_id}:{i}"
-                turns.append(Turn(
-                    id=turn_id,
-                    role=role,
-                    content=_norm_text(content),
-                    timestamp=ts_val or time.time(),
-                    metadata={k: v for k, v in m.items() if k not in ("text", "sender", "content")}
-                ))
-
-            yield Conversation(
-                id=conv_id,
-                title=title,
-                source=SourceType.ANTHROPIC,
-                created_at=created_at or time.time(),
-                updated_at=time.time(), # TODO: Find last message timestamp
-                turns=turns,
-                metadata=conv_data
-            )
-            
-        except Exception:
-            continue
+            import ijson.backends.yajl2_c as ijson
+        except ImportError:
+            import ijson
+    except ImportError:
+        raw = _load_json(p)
+        if isinstance(raw, list):
+            yield from raw
+        return
+    with open(p, "rb") as f:
+        yield from ijson.items(f, "item", use_float=True)
 
-def parse_chatgpt_unified(p: Path) -> Generator[Conversation, None, None]:
-    """Yield Conversation objects from ChatGPT conversations.json."""
-    raw = json.loads(p.read_text(encoding="utf-8", errors="ignore"))
-    if not isinstance(raw, list):
+# Export entries sent to a worker process per task
+PARSE_CHUNK_SIZE = 64
+
+def _parse_chunk(parse_one: Callable[[Dict[str, Any]], Optional[Conversation]],
+                 chunk: List[Dict[str, Any]]) -> List[Conversation]:
+    return [conv for conv in map(parse_one, chunk) if conv is not None]
+
+def _map_conversations(parse_one: Callable[[Dict[str, Any]], Optional[Conversation]],
+                       items: Iterable[Dict[str, Any]], workers: int) -> Generator[Conversation, None, None]:
+    """Apply parse_one to each export entry, in order, skipping malformed ones.
+
+    With ``workers`` > 1 chunks of entries are parsed in a process pool. Only
+    a couple of chunks per worker are in flight, so streamed input stays
+    streamed.
+    """
+    if workers <= 1:
+        for conv_data in items:
+            conv = parse_one(conv_data)
+            if conv is not None:
+                yield conv
         return
-    
-    for conv_data in raw:
-        try:
-            conv_id = conv_data.get("id") or Conversation.generate_id(json.dumps(conv_data))
-            title = conv_data.get("title") or "ChatGPT Conversation"
-            create_time = conv_data.get("create_time") or 0.0
+    it = iter(items)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(it, PARSE_CHUNK_SIZE))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_parse_chunk, parse_one, chunk))
+            if not pending:
+                return
+            yield from pending.popleft().result()
+
+def _parse_anthropic_conversation(conv_data: Dict[str, Any]) -> Optional[Conversation]:
+    """Build one Conversation from an Anthropic export entry, or None if malformed."""
+    # One clock read per conversation, shared by every missing timestamp
+    now = time.time()
+    try:
+        conv_id = conv_data.get("uuid") or conv_data.get("id") or Conversation.generate_id(
+            _anthropic_fingerprint(conv_data)
+        )
+        title = conv_data.get("name") or conv_data.get("summary") or "Anthropic Conversation"
+        created_at = 0.0
+        
+        # Try to find earliest timestamp
+        msgs = conv_data.get("chat_messages") or []
+        turns = []
+        
+        for i, m in enumerate(msgs):
+            role = _intern(m.get("sender") or m.get("role") or "user")
+            content = m.get("text") or ""
             
-            mapping = conv_data.get("mapping", {})
-            turns = []
+            # Parse timestamp
+            ts_iso = None
+            content_blocks = m.get("content")
+            if isinstance(content_blocks, list) and content_blocks:
+                block0 = content_blocks[0]
+                ts_iso = block0.get("start_timestamp") or block0.get("stop_timestamp")
+            ts_iso = ts_iso or m.get("created_at") or m.get("updated_at")
             
-            # Helper to collect messages in order (ChatGPT mapping is a tree)
-            # For now, we linearize by timestamp
-            messages = []
-            for msg_id, msg_data in mapping.items():
-                message = msg_data.get("message")
-                if not message or not message.get("content"):
-                    continue
-                    
-                role = message.get("author", {}).get("role", "user")
-                content_parts = message.get("content", {}).get("parts", [])
-                content = " ".join(str(part) for part in content_parts if part)
-                
-                if not content.strip():
-                    continue
+            ts_val = _parse_iso(ts_iso) if isinstance(ts_iso, str) else 0.0
+            
+            if i == 0 and ts_val > 0:
+                created_at = ts_val
+
+            # Shallow C-level copy, minus the fields already lifted out. The
+            # message dicts stay referenced from the conversation metadata,
+            # so they must not be popped in place.
+            extra = dict(m)
+            extra.pop("text", None)
+            extra.pop("sender", None)
+            extra.pop("content", None)
+
+            turn_id = f"{conv_id}:{i}"
+            turns.append(Turn(
+                id=turn_id,
+                role=role,
+                content=_norm_text(content),
+                timestamp=ts_val or now,
+                metadata=extra
+            ))
+
+        return Conversation(
+            id=conv_id,
+            title=title,
+            source=SourceType.ANTHROPIC,
+            created_at=created_at or now,
+            updated_at=now, # TODO: Find last message timestamp
+            turns=turns,
+            metadata=conv_data
+        )
+    except Exception:
+        return None
+
+def parse_conversations_unified(p: Path, workers: int = 1) -> Generator[Conversation, None, None]:
+    """Yield Conversation objects from Anthropic conversations.json."""
+    yield from _map_conversations(_parse_anthropic_conversation, _iter_json_array(p), workers)
+
+def _parse_chatgpt_conversation(conv_data: Dict[str, Any]) -> Optional[Conversation]:
+    """Build one Conversation from a ChatGPT export entry, or None if malformed."""
+    try:
+        conv_id = conv_data.get("id") or Conversation.generate_id(_chatgpt_fingerprint(conv_data))
+        title = conv_data.get("title") or "ChatGPT Conversation"
+        create_time = conv_data.get("create_time") or 0.0
+        
+        mapping = conv_data.get("mapping", {})
+        
+        # Helper to collect messages in order (ChatGPT mapping is a tree)
+        # For now, we linearize by timestamp
+        messages = []
+        for msg_id, msg_data in mapping.items():
+            message = msg_data.get("message")
+            if not message or not message.get("content"):
+                continue
                 
-                ts = message.get("create_time") or 0.0
-                messages.append({
-                    "role": role,
-                    "content": content,
-                    "ts": float(ts),
-                    "id": msg_id,
-                    "metadata": message.get("metadata", {})
-                })
+            role = _intern(message.get("author", {}).get("role", "user"))
+            content_parts = message.get("content", {}).get("parts", [])
+            if not content_parts:
+                continue
+            if len(content_parts) == 1 and isinstance(content_parts[0], str):
+                # The usual shape: a single text part, used without a join
+                content = content_parts[0]
+            else:
+                content = " ".join(str(part) for part in content_parts if part)
             
-            messages.sort(key=lambda x: x["ts"])
+            # isspace() answers the same question as strip() without a copy
+            if not content or content.isspace():
+                continue
             
-            for m in messages:
-                turns.append(Turn(
-                    id=m["id"],
-                    role=m["role"],
-                    content=_norm_text(m["content"]),
-                    timestamp=m["ts"],
-                    model=m["metadata"].get("model_slug"),
-                    metadata=m["metadata"]
-                ))
-
-            yield Conversation(
-                id=conv_id,
-                title=title,
-                source=SourceType.OPENAI,
-                created_at=float(create_time),
-                updated_at=turns[-1].timestamp if turns else float(create_time),
-                turns=turns,
-                metadata={"moderation_results": conv_data.get("moderation_results")}
+            ts = message.get("create_time") or 0.0
+            messages.append((float(ts), msg_id, role, content, message.get("metadata", {})))
+        
+        # Sort on the timestamp only (stable for ties), keyed in C
+        messages.sort(key=itemgetter(0))
+        
+        turns = [
+            Turn(
+                id=msg_id,
+                role=role,
+                content=_norm_text(content),
+                timestamp=ts,
+                model=metadata.get("model_slug"),
+                metadata=metadata
             )
-            
-        except Exception:
-            continue
+            for ts, msg_id, role, content, metadata in messages
+        ]
+
+        return Conversation(
+            id=conv_id,
+            title=title,
+            source=SourceType.OPENAI,
+            created_at=float(create_time),
+            updated_at=turns[-1].timestamp if turns else float(create_time),
+            turns=turns,
+            metadata={"moderation_results": conv_data.get("moderation_results")}
+        )
+    except Exception:
+        return None
+
+def parse_chatgpt_unified(p: Path, workers: int = 1) -> Generator[Conversation, None, None]:
+    """Yield Conversation objects from ChatGPT conversations.json."""
+    yield from _map_conversations(_parse_chatgpt_conversation, _iter_json_array(p), workers)
 
 # Keep legacy functions for now to avoid breaking existing indexing immediately
 # but mark them as deprecated if we were adding docstrings. 
 # We will redirect the indexer to use the unified parsers later.
 
+def flatten_conversation(conv: Conversation, source: str) -> Generator[Dict[str, Any], None, None]:
+    """Legacy: Flatten one unified conversation to doc dicts for SQLite."""
+    for i, turn in enumerate(conv.turns):
+        yield {
+            # Turn index already makes the id unique within the conversation
+            "id": f"{conv.id}:{i}:{turn.role}",
+            "conv_id": conv.id,
+            "title": conv.title,
+            "role": turn.role,
+            "ts": turn.timestamp,
+            "source": source,
+            "extra": turn.metadata,
+            "content": turn.content,
+            "msg_index": i,
+        }
+
 def parse_conversations(p: Path) -> Generator[Dict[str, Any], None, None]:
     """Legacy: Flatten unified conversations back to doc dicts for SQLite."""
     for conv in parse_conversations_unified(p):
-        for i, turn in enumerate(conv.turns):
-            yield {
-                "id": f"{conv.id}:{i}:{turn.role}:{abs(hash(turn.content))%10**9}",
-                "conv_id": conv.id,
-                "title": conv.title,
-                "role": turn.role,
-                "ts": turn.timestamp,
-                "source": "anthropic.conversations.json",
-                "extra": turn.metadata,
-                "content": turn.content,
-                "msg_index": i,
-            }
+        yield from flatten_conversation(conv, "anthropic.conversations.json")
 
 def parse_chatgpt_conversations(p: Path) -> Generator[Dict[str, Any], None, None]:
     """Legacy: Flatten unified conversations back to doc dicts for SQLite."""
     for conv in parse_chatgpt_unified(p):
-        for i, turn in enumerate(conv.turns):
-            yield {
-                "id": f"{conv.id}:{i}:{turn.role}:{abs(hash(turn.content))%10**9}",
-                "conv_id": conv.id,
-                "title": conv.title,
-                "role": turn.role,
-                "ts": turn.timestamp,
-                "source": "chatgpt.conversations.json",
-                "extra": turn.metadata,
-                "content": turn.content,
-                "msg_index": i,
-            }
+        yield from flatten_conversation(conv, "chatgpt.conversations.json")
 
 def parse_projects(p: Path) -> Generator[Dict[str, Any], None, None]:
     """Yield docs from anthropic-data/projects.json."""
     # Projects don't fit the Conversation model perfectly yet, keeping legacy for now
-    raw = json.loads(p.read_text(encoding="utf-8", errors="ignore"))
-    if not isinstance(raw, list):
-        return
-    for proj in raw:
+    now = time.time()
+    for proj in _iter_json_array(p):
         try:
-            conv_id = proj.get("uuid") or f"anthropic-project:{abs(hash(json.dumps(proj)))%10**9}"
-            title = proj.get("name") or "Anthropic Project"
-            description = proj.get("description") or ""
+            conv_id = proj.get("uuid") or f"anthropic-project:{_stable_hash(repr((proj.get('name'), proj.get('created_at'), proj.get('description'))))}"
+            title = proj.pop("name", None) or "Anthropic Project"
+            description = proj.pop("description", None) or ""
             yield {
                 "id": f"{conv_id}:project",
                 "conv_id": conv_id,
                 "title": title,
                 "role": "system",
-                "ts": time.time(),
+                "ts": now,
                 "source": "anthropic.projects.json",
-                "extra": {k: v for k, v in proj.items() if k not in ("name", "description")},
+                # proj is transient and name/description were popped above
+                "extra": proj,
                 "content": _norm_text(description),
                 "msg_index": 0,
             }
@@ -207,7 +365,7 @@ def parse_projects(p: Path) -> Generator[Dict[str, Any], None, None]:
                     "conv_id": conv_id,
                     "title": f"{title}: {filename}",
                     "role": "system",
-                    "ts": time.time(),
+                    "ts": now,
                     "source": "anthropic.projects.json",
                     "extra": {k: v for k, v in d.items() if k != "content"},
                     "content": _norm_text(content),
@@ -219,12 +377,12 @@ def parse_projects(p: Path) -> Generator[Dict[str, Any], None, None]:
 
 def parse_users(p: Path) -> Generator[Dict[str, Any], None, None]:
     """Yield a simple doc for anthropic-data/users.json."""
-    raw = json.loads(p.read_text(encoding="utf-8", errors="ignore"))
+    raw = _load_json(p)
     if isinstance(raw, list) and raw:
         content = json.dumps(raw[0], ensure_ascii=False)
     else:
         content = json.dumps(raw, ensure_ascii=False)
-    doc_id = f"anthropic-user:{abs(hash(content))%10**9}"
+    doc_id = f"anthropic-user:{_stable_hash(content)}"
     yield {
         "id": doc_id,
         "conv_id": "anthropic_user",
@@ -240,9 +398,9 @@ def parse_users(p: Path) -> Generator[Dict[str, Any], None, None]:
 def parse_chatgpt_user(p: Path) -> Generator[Dict[str, Any], None, None]:
     """Yield a simple doc for ChatGPT user.json."""
     try:
-        raw = json.loads(p.read_text(encoding="utf-8", errors="ignore"))
+        raw = _load_json(p)
         content = json.dumps(raw, ensure_ascii=False)
-        doc_id = f"chatgpt-user:{abs(hash(content))%10**9}"
+        doc_id = f"chatgpt-user:{_stable_hash(content)}"
         yield {
             "id": doc_id,
             "conv_id": "chatgpt_user",
@@ -4,6 +4,10 @@ from datetime import datetime
 from enum import Enum
 import hashlib
 import re
+import sys
+
+# __slots__ dataclasses (no per-instance __dict__) need Python 3.10+
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
 class SourceType(Enum):
     ANTHROPIC = "anthropic"
@@ -31,7 +35,7 @@ class EdgeType(Enum):
     REFERENCES = "references"      # turn -> turn (cross-conversation)
     FOLLOWS = "follows"            # turn -> turn (same conversation)
 
-@dataclass
+@dataclass(**_SLOTS)
 class Entity:
     """Represents a person, organization, place, or concept."""
     id: str
@@ -39,7 +43,7 @@ class Entity:
     type: str  # e.g., "person", "project", "technology"
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_SLOTS)
 class CodeBlock:
     """A code snippet extracted from content."""
     id: str
@@ -48,7 +52,7 @@ class CodeBlock:
     start_line: int = 0
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_SLOTS)
 class Link:
     """A URL extracted from content."""
     id: str
@@ -57,7 +61,7 @@ class Link:
     domain: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_SLOTS)
 class Artifact:
     """Represents a generated item like code, document, or image."""
     id: str
@@ -66,7 +70,7 @@ class Artifact:
     language: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_SLOTS)
 class Claim:
     """A fact or assertion extracted from a conversation."""
     id: str
@@ -75,7 +79,7 @@ class Claim:
     source_turn_id: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_SLOTS)
 class Decision:
     """A decision made during a conversation."""
     id: str
@@ -85,7 +89,7 @@ class Decision:
     source_turn_id: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_SLOTS)
 class Task:
     """A TODO or action item extracted from a conversation."""
     id: str
@@ -96,7 +100,7 @@ class Task:
     source_turn_id: Optional[str] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_SLOTS)
 class Turn:
     """A single exchange in a conversation (user or assistant)."""
     id: str
@@ -104,20 +108,22 @@ class Turn:
     content: str
     timestamp: float
     model: Optional[str] = None
-    artifacts: List[Artifact] = field(default_factory=list)
-    entities: List[Entity] = field(default_factory=list)
-    code_blocks: List[CodeBlock] = field(default_factory=list)
-    links: List[Link] = field(default_factory=list)
-    claims: List[Claim] = field(default_factory=list)
-    decisions: List[Decision] = field(default_factory=list)
-    tasks: List[Task] = field(default_factory=list)
+    # Extracted items are rare and stored in their own tables; None until
+    # set, so each Turn doesn't allocate seven empty lists
+    artifacts: Optional[List[Artifact]] = None
+    entities: Optional[List[Entity]] = None
+    code_blocks: Optional[List[CodeBlock]] = None
+    links: Optional[List[Link]] = None
+    claims: Optional[List[Claim]] = None
+    decisions: Optional[List[Decision]] = None
+    tasks: Optional[List[Task]] = None
     metadata: Dict[str, Any] = field(default_factory=dict)
 
     @property
     def datetime(self) -> datetime:
         return datetime.fromtimestamp(self.timestamp)
 
-@dataclass
+@dataclass(**_SLOTS)
 class Conversation:
     """A full conversation history."""
     id: str
@@ -132,9 +138,9 @@ class Conversation:
     @staticmethod
     def generate_id(content: str) -> str:
         """Generate a stable ID from content."""
-        return hashlib.sha256(content.encode()).hexdigest()[:16]
+        return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
 
-@dataclass
+@dataclass(**_SLOTS)
 class Node:
     """A node in the Knowledge Graph."""
     id: str
@@ -143,7 +149,7 @@ class Node:
     data: Any  # The actual object (Conversation, Turn, Entity, etc.)
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+@dataclass(**_SLOTS)
 class Edge:
     """An edge/relationship in the Knowledge Graph."""
     id: str
@@ -156,11 +162,18 @@ class Edge:
 
 # Extraction utilities
 
+_CODE_FENCE_RE = re.compile(r'```(\w*)\n(.*?)```', re.DOTALL)
+_MD_LINK_RE = re.compile(r'\[([^\]]*)\]\((https?://[^\)]+)\)')
+_URL_RE = re.compile(r'(?<!\()(https?://[^\s\)\]]+)')
+_DOMAIN_RE = re.compile(r'https?://([^/]+)')
+
 def extract_code_blocks(content: str, turn_id: str) -> List[CodeBlock]:
     """Extract code blocks from markdown content."""
-    pattern = r'```(\w*)\n(.*?)```'
     blocks = []
-    for i, match in enumerate(re.finditer(pattern, content, re.DOTALL)):
+    # Most turns have no fences; skip the regex scan for them
+    if '```' not in content:
+        return blocks
+    for i, match in enumerate(_CODE_FENCE_RE.finditer(content)):
         lang = match.group(1) or "text"
         code = match.group(2).strip()
         block_id = f"{turn_id}:code:{i}"
@@ -168,25 +181,24 @@ def extract_code_blocks(content: str, turn_id: str) -> List[CodeBlock]:
             id=block_id,
             language=lang,
             content=code,
-            start_line=content[:match.start()].count('\n')
+            start_line=content.count('\n', 0, match.start())
         ))
     return blocks
 
 def extract_links(content: str, turn_id: str) -> List[Link]:
     """Extract URLs from content."""
-    # Match markdown links and bare URLs
-    md_pattern = r'\[([^\]]*)\]\((https?://[^\)]+)\)'
-    url_pattern = r'(?<!\()(https?://[^\s\)\]]+)'
-    
     links = []
     seen_urls = set()
+    # Every link pattern requires a scheme
+    if 'http' not in content:
+        return links
     
     # Markdown links first
-    for i, match in enumerate(re.finditer(md_pattern, content)):
+    for i, match in enumerate(_MD_LINK_RE.finditer(content)):
         url = match.group(2)
         if url not in seen_urls:
             seen_urls.add(url)
-            domain = re.search(r'https?://([^/]+)', url)
+            domain = _DOMAIN_RE.search(url)
             links.append(Link(
                 id=f"{turn_id}:link:{len(links)}",
                 url=url,
@@ -195,11 +207,11 @@ def extract_links(content: str, turn_id: str) -> List[Link]:
             ))
     
     # Bare URLs
-    for match in re.finditer(url_pattern, content):
+    for match in _URL_RE.finditer(content):
         url = match.group(1)
         if url not in seen_urls:
             seen_urls.add(url)
-            domain = re.search(r'https?://([^/]+)', url)
+            domain = _DOMAIN_RE.search(url)
             links.append(Link(
                 id=f"{turn_id}:link:{len(links)}",
                 url=url,
@@ -207,5 +219,3 @@ def extract_links(content: str, turn_id: str) -> List[Link]:
             ))
     
     return links
-
-
@@ -1,214 +1,19 @@
-import argparse, sqlite3, os, re
-from flask import Flask, request, render_template_string, redirect, url_for, flash, jsonify
+import argparse, sqlite3, os, re, queue, threading, hashlib
+from contextlib import closing, contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlencode
+from flask import Flask, request, render_template, render_template_string, stream_with_context, redirect, url_for, flash, jsonify
+from markupsafe import Markup, escape
+
+from indexer import split_field_filters
 
 
 TEMPLATE = """
 <!doctype html>
 <title>Inchive</title>
-<style>
-* { box-sizing: border-box; }
-body { 
-  font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif; 
-  margin: 0; padding: 0;
-  background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-  min-height: 100vh;
-  line-height: 1.6;
-}
-.container { 
-  max-width: 1400px; margin: 0 auto; background: white; 
-  min-height: 100vh; box-shadow: 0 0 50px rgba(0,0,0,0.1);
-}
-.header {
-  background: linear-gradient(135deg, #1e3a8a 0%, #3730a3 100%);
-  color: white; padding: 24px 32px; 
-  box-shadow: 0 4px 20px rgba(0,0,0,0.1);
-}
-.header h1 { margin: 0; font-size: 28px; font-weight: 700; }
-.header .subtitle { opacity: 0.9; font-size: 16px; margin-top: 4px; }
-.content { padding: 32px; }
-.search-section {
-  background: #f8fafc; padding: 32px; border-radius: 16px; 
-  margin-bottom: 32px; box-shadow: 0 2px 8px rgba(0,0,0,0.04);
-}
-.search-row { display: flex; gap: 16px; align-items: center; margin-bottom: 20px; flex-wrap: wrap; }
-.search-input { 
-  flex: 1; min-width: 300px; padding: 16px 20px; font-size: 18px; 
-  border: 2px solid #e2e8f0; border-radius: 12px; 
-  transition: all 0.2s; background: white;
-}
-.search-input:focus{ 
-  outline: none; border-color: #3b82f6; 
-  box-shadow: 0 0 0 4px rgba(59,130,246,0.1); transform: translateY(-1px);
-}
-.search-btn { 
-  padding: 16px 32px; font-size: 18px; font-weight: 600;
-  background: linear-gradient(135deg, #3b82f6 0%, #1d4ed8 100%); 
-  color: white; border: none; border-radius: 12px; cursor: pointer; 
-  transition: all 0.2s; box-shadow: 0 4px 12px rgba(59,130,246,0.3);
-}
-.search-btn:hover{ 
-  transform: translateY(-2px); 
-  box-shadow: 0 6px 20px rgba(59,130,246,0.4); 
-}
-.controls{ 
-  display:flex; gap:20px; align-items:center; flex-wrap:wrap; 
-  padding: 20px; background: white; border-radius: 12px; 
-  box-shadow: 0 1px 3px rgba(0,0,0,0.1);
-}
-.control-group { display: flex; align-items: center; gap: 8px; }
-.control-group label { font-weight: 500; color: #374151; white-space: nowrap; }
-.control-group input, .control-group select { 
-  padding: 8px 12px; border: 1px solid #d1d5db; border-radius: 8px; 
-  font-size: 14px; transition: border-color 0.2s;
-}
-.control-group input:focus, .control-group select:focus { 
-  outline: none; border-color: #3b82f6; 
-}
-.checkbox-label { display: flex; align-items: center; gap: 8px; cursor: pointer; }
-.result{ 
-  border: 1px solid #e5e7eb; padding: 24px; margin: 20px 0; 
-  border-radius: 16px; background: white; 
-  box-shadow: 0 2px 12px rgba(0,0,0,0.06); 
-  transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-}
-.result:hover{ 
-  transform: translateY(-4px); 
-  box-shadow: 0 8px 25px rgba(0,0,0,0.12); 
-  border-color: #3b82f6;
-}
-.result-header { display: flex; justify-content: space-between; align-items: flex-start; margin-bottom: 16px; }
-.result-title { font-size: 20px; font-weight: 700; color: #111827; margin: 0; }
-.result-title a { color: inherit; text-decoration: none; }
-.result-title a:hover { color: #3b82f6; }
-.result-meta { display: flex; gap: 12px; flex-wrap: wrap; align-items: center; margin-bottom: 16px; }
-.pill{ 
-  padding: 6px 14px; border-radius: 20px; font-size: 13px; 
-  font-weight: 600; text-transform: uppercase; letter-spacing: 0.5px;
-  border: 1px solid; cursor: pointer; transition: all 0.2s;
-}
-.pill:hover { transform: translateY(-1px); box-shadow: 0 2px 8px rgba(0,0,0,0.15); }
-.pill.anthropic { 
-  background: linear-gradient(135deg, #dbeafe 0%, #bfdbfe 100%); 
-  color: #1e40af; border-color: #93c5fd;
-}
-.pill.chatgpt { 
-  background: linear-gradient(135deg, #dcfce7 0%, #bbf7d0 100%); 
-  color: #166534; border-color: #86efac;
-}
-.pill.default { 
-  background: linear-gradient(135deg, #f3f4f6 0%, #e5e7eb 100%); 
-  color: #374151; border-color: #d1d5db;
-}
-.result-content { font-size: 16px; line-height: 1.7; color: #374151; margin-bottom: 16px; }
-.expand-context { margin-top: 16px; padding: 16px; background: #f8fafc; border-radius: 12px; border: 1px solid #e2e8f0; }
-.context-message { margin-bottom: 16px; padding: 12px; border-radius: 8px; }
-.context-message.current { background: #fef3c7; border: 2px solid #f59e0b; }
-.context-message.user { background: #eff6ff; }
-.context-message.assistant { background: #f0fdf4; }
-.context-header { font-weight: 600; margin-bottom: 8px; color: #374151; }
-.context-content { color: #6b7280; }
-.expand-btn { color: #3b82f6; cursor: pointer; font-weight: 500; }
-.expand-btn:hover { text-decoration: underline; }
-mark{ background: linear-gradient(135deg, #fef08a 0%, #fde047 100%); padding: 3px 6px; border-radius: 6px; font-weight: 600; }
-.result-actions { display: flex; gap: 16px; align-items: center; }
-.result-actions a { 
-  color: #6b7280; text-decoration: none; font-weight: 500; 
-  transition: color 0.2s; display: flex; align-items: center; gap: 4px;
-}
-.result-actions a:hover { color: #3b82f6; }
-.result-footer { 
-  border-top: 1px solid #f3f4f6; padding-top: 12px; margin-top: 16px;
-  font-size: 13px; color: #9ca3af; display: flex; gap: 16px;
-}
-.stats { 
-  background: #f1f5f9; padding: 20px; border-radius: 12px; 
-  margin-bottom: 24px; text-align: center; color: #475569; font-weight: 500;
-}
-.reindex-section {
-  background: #fefefe; border: 2px dashed #d1d5db; 
-  padding: 24px; border-radius: 12px; margin-bottom: 32px;
-}
-.reindex-form { display: flex; gap: 12px; align-items: center; flex-wrap: wrap; }
-.reindex-input { 
-  flex: 1; min-width: 300px; padding: 12px 16px; 
-  border: 1px solid #d1d5db; border-radius: 8px; font-size: 14px;
-}
-.reindex-btn { 
-  padding: 12px 24px; background: #10b981; color: white; 
-  border: none; border-radius: 8px; font-weight: 600; cursor: pointer;
-  transition: background 0.2s;
-}
-.reindex-btn:hover { background: #059669; }
-.flash-messages{ margin: 24px 0; }
-.flash{ 
-  padding: 16px 20px; border-radius: 12px; margin: 12px 0; 
-  font-weight: 500; display: flex; align-items: center; gap: 12px;
-}
-.flash.success{ background: #d1fae5; color: #065f46; border-left: 4px solid #10b981; }
-.flash.error{ background: #fee2e2; color: #991b1b; border-left: 4px solid #ef4444; }
-.flash.warning{ background: #fef3c7; color: #92400e; border-left: 4px solid #f59e0b; }
-/* Date range picker styles */
-.date-range-container { margin: 8px 0; }
-.date-range-container input[type="date"] { 
-  min-width: 130px; 
-}
-.date-range-container input[type="date"]:focus {
-  border-color: #3b82f6;
-  box-shadow: 0 0 0 2px rgba(59,130,246,0.1);
-}
-.filter-section { 
-  background: white; border-radius: 12px; padding: 20px; 
-  box-shadow: 0 1px 3px rgba(0,0,0,0.1); margin-bottom: 20px;
-}
-.realtime-note {
-  font-size: 12px; color: #10b981; margin-top: 8px; 
-  display: flex; align-items: center; gap: 4px;
-}
-/* Conversation shelf styles */
-.conversation-shelf {
-  position: fixed; top: 0; right: -50%; width: 50%; height: 100vh;
-  background: white; box-shadow: -4px 0 20px rgba(0,0,0,0.15);
-  transition: right 0.3s ease-in-out; z-index: 1000;
-  display: flex; flex-direction: column;
-}
-.conversation-shelf.open { right: 0; }
-.shelf-header {
-  background: linear-gradient(135deg, #1e3a8a 0%, #3730a3 100%);
-  color: white; padding: 20px; display: flex; justify-content: space-between; align-items: center;
-  box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-}
-.shelf-content { flex: 1; overflow-y: auto; padding: 20px; }
-.shelf-close {
-  background: rgba(255,255,255,0.2); border: none; color: white;
-  border-radius: 6px; padding: 8px 12px; cursor: pointer; font-size: 16px;
-}
-.shelf-close:hover { background: rgba(255,255,255,0.3); }
-.shelf-overlay {
-  position: fixed; top: 0; left: 0; width: 100%; height: 100%;
-  background: rgba(0,0,0,0.5); opacity: 0; visibility: hidden;
-  transition: all 0.3s ease-in-out; z-index: 999;
-}
-.shelf-overlay.open { opacity: 1; visibility: visible; }
-.message-item {
-  border: 1px solid #e5e7eb; border-radius: 12px; padding: 16px; margin: 12px 0;
-  background: #fafafa;
-}
-.message-role {
-  font-weight: 600; margin-bottom: 8px; display: flex; align-items: center; gap: 8px;
-}
-.message-content { white-space: pre-wrap; line-height: 1.5; }
-@media (max-width: 768px) {
-  .content { padding: 20px; }
-  .search-row { flex-direction: column; }
-  .search-input { min-width: 100%; }
-  .controls { flex-direction: column; align-items: flex-start; gap: 12px; }
-  .result-header { flex-direction: column; gap: 12px; }
-  .date-range-container { flex-direction: column; align-items: stretch; gap: 4px; }
-  .date-range-container input[type="date"] { min-width: unset; }
-  .conversation-shelf { width: 100%; right: -100%; }
-  .conversation-shelf.open { right: 0; }
-}
-</style>
+<link rel="stylesheet" href="{{ url_for('static', filename='app.css', v=css_version) }}">
 <meta name="referrer" content="no-referrer"/>
 <div class="container">
   <div class="header">
@@ -308,12 +113,12 @@ mark{ background: linear-gradient(135deg, #fef08a 0%, #fde047 100%); padding: 3p
       </form>
     </div>
 
-
+{# results #}
     {% if rows is not none %}
       <div class="stats">
-        <strong>{{total_count}}</strong> result(s) found
+        <strong>{{total_count}}{% if count_capped %}+{% endif %}</strong> result(s) found
         {% if total_pages > 1 %}
-          • Page {{page}} of {{total_pages}}
+          • Page {{page}} of {{total_pages}}{% if count_capped %}+{% endif %}
           • Showing {{per_page}} per page
         {% endif %}
       </div>
@@ -327,10 +132,10 @@ mark{ background: linear-gradient(135deg, #fef08a 0%, #fde047 100%); padding: 3p
           </div>
           
           <div class="result-meta">
-            <div class="pill {% if 'anthropic' in r['source'] %}anthropic{% elif 'chatgpt' in r['source'] %}chatgpt{% else %}default{% endif %}" 
-                 onclick="filterByProvider('{% if 'anthropic' in r['source'] %}claude{% elif 'chatgpt' in r['source'] %}chatgpt{% endif %}')" 
+            <div class="pill {{r['pill_class']}}" 
+                 onclick="filterByProvider('{% if r['provider'] %}{{r['provider']}}{% endif %}')" 
                  title="Click to filter by this provider">
-              {% if 'anthropic' in r['source'] %}🔵 Claude{% elif 'chatgpt' in r['source'] %}🟢 ChatGPT{% else %}{{r['source']}}{% endif %}
+              {{r['provider_label']}}
             </div>
             <div class="pill default" onclick="filterByRole('{% if r['role'] == 'user' %}user{% else %}assistant{% endif %}')" title="Click to filter by {% if r['role'] == 'user' %}human{% else %}assistant{% endif %} messages">
               {% if r['role'] == 'user' %}👤 Human{% else %}🤖 Assistant{% endif %}
@@ -350,7 +155,7 @@ mark{ background: linear-gradient(135deg, #fef08a 0%, #fde047 100%); padding: 3p
             </a>
             {% if r['external_url'] %}
               <a href="{{ r['external_url'] }}" target="_blank" rel="noopener noreferrer">
-                {% if 'chatgpt' in r['source'] %}🔗 Open in ChatGPT{% else %}🔗 Open in Claude{% endif %}
+                {% if r['provider'] == 'chatgpt' %}🔗 Open in ChatGPT{% else %}🔗 Open in Claude{% endif %}
               </a>
             {% endif %}
           </div>
@@ -365,7 +170,7 @@ mark{ background: linear-gradient(135deg, #fef08a 0%, #fde047 100%); padding: 3p
       {% if total_pages > 1 %}
         <div style="display: flex; justify-content: center; align-items: center; gap: 16px; margin: 32px 0; padding: 24px;">
           {% if has_prev %}
-            <a href="?q={{q|e}}&wild={{wild|int}}&provider={{provider}}&role={{role}}&date_from={{date_from}}&date_to={{date_to}}&sort={{sort}}&page={{page-1}}&per_page={{per_page}}" 
+            <a href="?{{paginate_base}}&page={{page-1}}&per_page={{per_page}}" 
                style="padding: 12px 20px; background: #3b82f6; color: white; text-decoration: none; border-radius: 8px; font-weight: 500;">
               ← Previous
             </a>
@@ -376,7 +181,7 @@ mark{ background: linear-gradient(135deg, #fef08a 0%, #fde047 100%); padding: 3p
               {% if p == page %}
                 <span style="padding: 8px 12px; background: #1e40af; color: white; border-radius: 6px; font-weight: 600;">{{p}}</span>
               {% elif p <= 3 or p >= total_pages - 2 or (p >= page - 1 and p <= page + 1) %}
-                <a href="?q={{q|e}}&wild={{wild|int}}&provider={{provider}}&role={{role}}&date_from={{date_from}}&date_to={{date_to}}&sort={{sort}}&page={{p}}&per_page={{per_page}}" 
+                <a href="?{{paginate_base}}&page={{p}}&per_page={{per_page}}" 
                    style="padding: 8px 12px; color: #374151; text-decoration: none; border-radius: 6px; transition: background 0.2s;">{{p}}</a>
               {% elif p == 4 or p == total_pages - 3 %}
                 <span style="color: #9ca3af;">…</span>
@@ -385,7 +190,7 @@ mark{ background: linear-gradient(135deg, #fef08a 0%, #fde047 100%); padding: 3p
           </div>
           
           {% if has_next %}
-            <a href="?q={{q|e}}&wild={{wild|int}}&provider={{provider}}&role={{role}}&date_from={{date_from}}&date_to={{date_to}}&sort={{sort}}&page={{page+1}}&per_page={{per_page}}" 
+            <a href="?{{paginate_base}}&page={{page+1}}&per_page={{per_page}}{% if next_after_id %}&after_date={{next_after_date|urlencode}}&after_id={{next_after_id|urlencode}}{% endif %}" 
                style="padding: 12px 20px; background: #3b82f6; color: white; text-decoration: none; border-radius: 8px; font-weight: 500;">
               Next →
             </a>
@@ -393,7 +198,7 @@ mark{ background: linear-gradient(135deg, #fef08a 0%, #fde047 100%); padding: 3p
         </div>
         
         <div style="text-align: center; margin: 16px 0;">
-          <select onchange="window.location.href='?q={{q|e}}&wild={{wild|int}}&provider={{provider}}&role={{role}}&date_from={{date_from}}&date_to={{date_to}}&sort={{sort}}&page=1&per_page=' + this.value" 
+          <select onchange="window.location.href='?{{paginate_base}}&page=1&per_page=' + this.value" 
                   style="padding: 8px 12px; border: 1px solid #d1d5db; border-radius: 6px;">
             <option value="50" {% if per_page == 50 %}selected{% endif %}>50 per page</option>
             <option value="100" {% if per_page == 100 %}selected{% endif %}>100 per page</option>
@@ -526,6 +331,9 @@ function applyFilters() {
 </script>
 """
 
+# Where TEMPLATE splits into the page head and the search results
+RESULTS_MARKER = "{# results #}"
+
 ADMIN_TEMPLATE = """
 <!doctype html>
 <title>Admin - Inchive</title>
@@ -696,12 +504,259 @@ ORDER BY rank
 """
 
 
+# En/em dashes split search terms like spaces do
+_DASH_TABLE = str.maketrans({'\u2013': ' ', '\u2014': ' '})
+# Tokens containing FTS5 syntax are passed through untouched (substring test)
+_FTS_OPERATOR_RE = re.compile(r"[\"':]|AND|OR|NOT|NEAR")
+
+
+def _expand_tokens(txt: str) -> str:
+    """Turn plain search words into FTS5 prefix queries."""
+    expanded = []
+    for p in txt.translate(_DASH_TABLE).split():
+        # FTS5 has no leading wildcards; a bare or leading * is a syntax error
+        p = p.lstrip('*')
+        if not p:
+            continue
+        if _FTS_OPERATOR_RE.search(p):
+            expanded.append(p)
+        elif len(p) > 2:
+            # Quote tokens with special chars to prevent FTS errors
+            if '-' in p or '+' in p:
+                expanded.append('"' + p.rstrip('*') + '"*')
+            else:
+                expanded.append(p.rstrip('*') + '*')
+        else:
+            expanded.append(p)
+    return " ".join(expanded)
+
+
+# FTS5 only indexes letters and digits; a query without any can't match
+_SEARCHABLE_RE = re.compile(r"[^\W_]")
+
+
+def _conversation_rows(conn: sqlite3.Connection, conv_id: str) -> list:
+    """(role, date, content, title, is_anthropic, is_chatgpt) tuples for one conversation, in order."""
+    cur = conn.cursor()
+    # Rows are read by position only; skip building sqlite3.Row objects
+    cur.row_factory = None
+    # Provider flags come back as small ints instead of copying source per row
+    return cur.execute(
+        "SELECT role, date, content, title,"
+        " instr(source, 'anthropic') > 0, instr(source, 'chatgpt') > 0"
+        " FROM docs WHERE conv_id=? ORDER BY ts, rowid",
+        (conv_id,)
+    ).fetchall()
+
+
+@lru_cache(maxsize=64)
+def _provider_display(source: str) -> Dict[str, Optional[str]]:
+    """Provider fields of a result row, classified once per docs.source label.
+
+    Callers merge the dict into each row with ``**``, so it is never mutated.
+    """
+    if source and "anthropic" in source:
+        return {"provider": "claude", "pill_class": "anthropic", "provider_label": "🔵 Claude"}
+    if source and "chatgpt" in source:
+        return {"provider": "chatgpt", "pill_class": "chatgpt", "provider_label": "🟢 ChatGPT"}
+    return {"provider": None, "pill_class": "default", "provider_label": source}
+
+
+_UUID_RE = re.compile(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$")
+
+
+def _looks_like_uuid(u: str) -> bool:
+    return isinstance(u, str) and _UUID_RE.match(u) is not None
+
+
+# Stop counting matches past this; the page shows "10000+" instead
+SEARCH_COUNT_CAP = 10000
+# Distinct (query, filters) counts remembered per index
+SEARCH_COUNT_CACHE_SIZE = 512
+
+# Template fragments joined per write when streaming a page
+STREAM_BUFFER_CHUNKS = 50
+
+
+def _buffered(chunks: Iterator[str], size: int = STREAM_BUFFER_CHUNKS) -> Iterator[str]:
+    """Group Jinja's many tiny output strings into fewer, larger writes."""
+    buf = []
+    for chunk in chunks:
+        buf.append(chunk)
+        if len(buf) >= size:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
+
+
+# Leading characters shown for results that have no FTS snippet
+SNIPPET_EXCERPT_CHARS = 160
+
+# Rendered-ready search pages remembered per index (up to 500 rows each)
+SEARCH_PAGE_CACHE_SIZE = 256
+
+# Read-only connections shared by request threads; WAL readers never block each other
+READ_POOL_SIZE = min(8, os.cpu_count() or 1)
+
+
+class ReadPool:
+    """Small pool of read-only SQLite connections, opened on first use."""
+    
+    def __init__(self, db_path: str, size: int = READ_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._counts = {}
+        self._pages = {}
+    
+    def _connect(self) -> sqlite3.Connection:
+        path = Path(self.db_path).resolve()
+        if self._opened == 0:
+            # Planner statistics of older indexes may be missing or stale;
+            # refreshing them needs a (short-lived) writable handle. WAL mode
+            # is the indexer's job (ensure_db), not the server's.
+            try:
+                with closing(sqlite3.connect(str(path))) as writer:
+                    writer.execute("PRAGMA optimize;")
+            except sqlite3.Error:
+                pass
+        conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA mmap_size=268435456;")
+        conn.execute("PRAGMA cache_size=-65536;")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        return conn
+    
+    @contextmanager
+    def acquire(self):
+        """Borrow a connection for the duration of a request."""
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._opened < self.size
+                if can_open:
+                    self._opened += 1
+            if can_open:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._opened -= 1
+                    raise
+            else:
+                conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            if self._closed:
+                conn.close()
+            else:
+                self._idle.put(conn)
+    
+    def data_version(self) -> tuple:
+        """Changes whenever the database is written, by any process.
+
+        PRAGMA data_version is per connection, so the pool keys its caches
+        on the size and mtime of the database file and its WAL instead.
+        """
+        version = []
+        for path in (self.db_path, self.db_path + "-wal"):
+            try:
+                st = os.stat(path)
+                version.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
+    
+    def count(self, conn: sqlite3.Connection, sql: str, params: tuple) -> int:
+        """Run a COUNT query, reusing the result for repeated searches."""
+        # Versioned key: a rebuild by another process (e.g. the CLI indexer)
+        # must not leave stale totals behind
+        key = (self.data_version(), sql, params)
+        n = self._counts.get(key)
+        if n is None:
+            n = conn.execute(sql, params).fetchone()[0]
+            # Paging through one search repeats its count
+            if len(self._counts) >= SEARCH_COUNT_CACHE_SIZE:
+                self._counts.clear()
+            self._counts[key] = n
+        return n
+    
+    def cached_page(self, key: tuple):
+        """Previously stored search page for these request parameters, or None."""
+        return self._pages.get(key)
+    
+    def store_page(self, key: tuple, page: tuple) -> None:
+        # Callers put data_version() in the key, so pages of an older index never match
+        if len(self._pages) >= SEARCH_PAGE_CACHE_SIZE:
+            self._pages.clear()
+        self._pages[key] = page
+    
+    def close(self) -> None:
+        """Close idle connections now and borrowed ones when they come back."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
 def make_app(db_path: str):
     app = Flask(__name__)
     app.secret_key = os.environ.get("FLASK_SECRET", "dev")
-    db_holder = {"conn": sqlite3.connect(db_path, check_same_thread=False), "db_path": db_path}
-    db_holder["conn"].row_factory = sqlite3.Row
+    # The stylesheet URL carries a content hash, so browsers may cache it for good
+    app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 31536000
+    css_path = Path(app.static_folder) / "app.css"
+    app.jinja_env.globals["css_version"] = hashlib.blake2b(css_path.read_bytes(), digest_size=6).hexdigest()
+    try:
+        # Optional: gzip/brotli for HTML and static responses (pip install Flask-Compress)
+        from flask_compress import Compress
+        Compress(app)
+    except ImportError:
+        pass
+    db_holder = {"pool": ReadPool(db_path), "db_path": db_path}
+    # Compile the page templates once; render_template_string re-parses per call
+    home_template = app.jinja_env.from_string(TEMPLATE)
+    # Search pages stream the head before running the query (see home())
+    home_head, home_results = (
+        app.jinja_env.from_string(part) for part in TEMPLATE.split(RESULTS_MARKER)
+    )
+    admin_template = app.jinja_env.from_string(ADMIN_TEMPLATE)
     claude_url_template = os.environ.get("CLAUDE_URL_TEMPLATE", "https://claude.ai/chat/{conv_id}")
+    export_default = os.path.abspath(os.path.join(os.path.dirname(__file__), 'files'))
+
+    def safe_url_format(conv_id: str, source: str = "") -> str:
+        try:
+            # Handle ChatGPT links
+            if "chatgpt" in source.lower():
+                return f"https://chatgpt.com/c/{conv_id}"
+            
+            # Handle Claude links with template
+            if "{conv_id}" in claude_url_template:
+                return claude_url_template.replace("{conv_id}", conv_id)
+            elif "%7Bconv_id%7D" in claude_url_template:
+                return claude_url_template.replace("%7Bconv_id%7D", conv_id)
+            else:
+                # If no placeholder, just append the conv_id
+                return f"{claude_url_template.rstrip('/')}/{conv_id}"
+        except Exception:
+            return None
+
+    # Results cluster by conversation, so most rows repeat an earlier lookup
+    @lru_cache(maxsize=4096)
+    def external_url(conv_id: str, source: str):
+        if source and (
+            ("anthropic" in source and _looks_like_uuid(conv_id)) or
+            ("chatgpt" in source and conv_id)
+        ):
+            return safe_url_format(conv_id, source)
+        return None
 
     @app.route("/", methods=["GET"])
     def home():
@@ -710,36 +765,9 @@ def make_app(db_path: str):
         date_from = request.args.get("date_from") or None
         date_to = request.args.get("date_to") or None
         sort = request.args.get("sort") or "rank"
-        provider_filter = request.args.get("provider", "")
-        role_filter = request.args.get("role", "")
-        page = int(request.args.get("page", "1"))
-        per_page = int(request.args.get("per_page", "100"))
-        
-        # Limit per_page to reasonable values
-        per_page = min(max(per_page, 10), 500)
-        offset = (page - 1) * per_page
-
-        rows = None
-        total_count = 0
-
-        def expand_tokens(txt):
-            parts = [p for p in txt.replace('\u2013', ' ').replace('\u2014', ' ').split() if p]
-            expanded = []
-            for p in parts:
-                if any(op in p for op in ['"', "'", "AND", "OR", "NOT", "NEAR", ":"]):
-                    expanded.append(p)
-                elif len(p) > 2:
-                    # Quote tokens with special chars to prevent FTS errors
-                    if '-' in p or '+' in p:
-                        expanded.append('"' + p + '"*')
-                    else:
-                        expanded.append(p + '*')
-                else:
-                    expanded.append(p)
-            return " ".join(expanded)
 
         # Easter egg for precision tom
-        if q.lower().strip() == "precision tom":
+        if q.lower() == "precision tom":
             enriched = [{
                 "id": "easter-egg-1",
                 "conv_id": "precision-tom-2025",
@@ -747,11 +775,12 @@ def make_app(db_path: str):
                 "role": "system",
                 "date": "2025-01-24",
                 "source": "easter.egg",
+                **_provider_display("easter.egg"),
                 "snip": "You found the <mark>precision tom</mark> easter egg! 🎉 This search tool was built with precision, care, and attention to detail. Thanks for exploring!",
                 "external_url": None
             }]
-            return render_template_string(
-                TEMPLATE,
+            return render_template(
+                home_template,
                 q=q,
                 rows=enriched,
                 wild=wild,
@@ -767,125 +796,251 @@ def make_app(db_path: str):
                 export_default=export_default,
             )
 
-        if q:
-            base_sql = (
-                "SELECT d.id, d.conv_id, d.title, d.role, d.date, d.source, "
-                "snippet(docs_fts, 0, '<mark>', '</mark>', ' … ', 12) as snip "
-                "FROM docs_fts JOIN docs d ON d.rowid = docs_fts.rowid "
-                "WHERE docs_fts MATCH ?"
-            )
-            params = []
-            q_try = expand_tokens(q) if wild else q
-            params.append(q_try)
-            if date_from:
-                base_sql += " AND (d.date IS NOT NULL AND d.date >= ?)"
-                params.append(date_from)
-            if date_to:
-                base_sql += " AND (d.date IS NOT NULL AND d.date <= ?)"
-                params.append(date_to)
-            if provider_filter:
-                if provider_filter == "claude":
-                    base_sql += " AND d.source LIKE '%anthropic%'"
-                elif provider_filter == "chatgpt":
-                    base_sql += " AND d.source LIKE '%chatgpt%'"
-            if role_filter:
-                if role_filter == "assistant":
-                    base_sql += " AND (d.role = 'assistant' OR d.role = 'system')"
+        provider_filter = request.args.get("provider", "")
+        role_filter = request.args.get("role", "")
+        page = int(request.args.get("page", "1"))
+        # "Next" on date sorts carries the last row's (date, id) to seek past
+        after_id = request.args.get("after_id") or None
+        after_date = request.args.get("after_date") or None
+        per_page = int(request.args.get("per_page", "100"))
+        
+        # Limit per_page to reasonable values
+        per_page = min(max(per_page, 10), 500)
+        offset = (page - 1) * per_page
+
+        # The page head and search form render from the request alone
+        head_ctx = {
+            "q": q,
+            "wild": wild,
+            "date_from": date_from or "",
+            "date_to": date_to or "",
+            "sort": sort,
+            "provider": provider_filter,
+            "role": role_filter,
+            "page": page,
+            "per_page": per_page,
+            "export_default": export_default,
+        }
+        app.update_template_context(head_ctx)
+
+        def search_results() -> dict:
+            """Run the search and return the results part of the template context."""
+            rows = None
+            snips = {}
+            next_after_date = next_after_id = None
+            total_count = 0
+
+            # role:/source:/... tokens filter on docs columns instead of reaching FTS
+            q_text, field_filters = split_field_filters(q)
+            if not _SEARCHABLE_RE.search(q_text):
+                q_text = ""
+            if q and not q_text and not field_filters:
+                # Punctuation-only input: answer "no results" without SQLite
+                rows = []
+            elif q:
+                # Paging back and forth repeats identical searches; serve those
+                # from memory until the database changes (reindex here or a
+                # rebuild by another process)
+                pool = db_holder["pool"]
+                page_key = (pool.data_version(), q, wild, date_from, date_to, sort,
+                            provider_filter, role_filter, page, per_page, after_date, after_id)
+                cached = pool.cached_page(page_key)
+                if cached is not None:
+                    rows, snips, total_count, next_after_date, next_after_id = cached
                 else:
-                    base_sql += " AND d.role = ?"
-                    params.append(role_filter)
-            # Get total count first
-            count_sql = base_sql.replace(
-                "SELECT d.id, d.conv_id, d.title, d.role, d.date, d.source, snippet(docs_fts, 0, '<mark>', '</mark>', ' … ', 12) as snip",
-                "SELECT COUNT(*)"
-            )
-            total_count = db_holder["conn"].execute(count_sql, tuple(params)).fetchone()[0]
+                    with pool.acquire() as conn:
+                        # Rank and page on metadata only; snippets come afterwards for the
+                        # page's rows, instead of for every match before the sort
+                        base_sql = (
+                            "SELECT d.rowid, d.id, d.conv_id, d.title, d.role, d.date, d.source"
+                        )
+                        params = []
+                        if q_text:
+                            from_sql = (
+                                # CROSS JOIN pins docs_fts as the outer loop, so the MATCH
+                                # drives the scan even when a date/role index looks cheaper
+                                " FROM docs_fts CROSS JOIN docs d ON d.rowid = docs_fts.rowid "
+                                "WHERE docs_fts MATCH ?"
+                            )
+                            q_try = _expand_tokens(q_text) if wild else q_text
+                            params.append(q_try)
+                        else:
+                            # Only field filters: no MATCH, so no rank or snippets
+                            from_sql = " FROM docs d WHERE 1"
+                        for condition, value in field_filters:
+                            from_sql += f" AND {condition}"
+                            params.append(value)
+                        if date_from:
+                            from_sql += " AND (d.date IS NOT NULL AND d.date >= ?)"
+                            params.append(date_from)
+                        if date_to:
+                            from_sql += " AND (d.date IS NOT NULL AND d.date <= ?)"
+                            params.append(date_to)
+                        if provider_filter:
+                            if provider_filter == "claude":
+                                from_sql += " AND d.source LIKE '%anthropic%'"
+                            elif provider_filter == "chatgpt":
+                                from_sql += " AND d.source LIKE '%chatgpt%'"
+                        if role_filter:
+                            if role_filter == "assistant":
+                                from_sql += " AND (d.role = 'assistant' OR d.role = 'system')"
+                            else:
+                                from_sql += " AND d.role = ?"
+                                params.append(role_filter)
+                        # Get total count first, bounded so huge result sets stop early
+                        count_sql = f"SELECT COUNT(*) FROM (SELECT 1{from_sql} LIMIT {SEARCH_COUNT_CAP + 1})"
+                        total_count = pool.count(conn, count_sql, tuple(params))
+                        
+                        base_sql += from_sql
+                        # Date sorts break ties on id so seek pagination has a total order.
+                        # Seeking skips the preceding rows in the WHERE instead of making
+                        # the sorter hold and discard them for OFFSET; undated rows sort last.
+                        seek_params = []
+                        seek = after_id is not None and sort in ("newest", "oldest")
+                        if seek:
+                            cmp = "<" if sort == "newest" else ">"
+                            if after_date:
+                                base_sql += f" AND (d.date IS NULL OR d.date {cmp} ? OR (d.date = ? AND d.id {cmp} ?))"
+                                seek_params = [after_date, after_date, after_id]
+                            else:
+                                base_sql += f" AND d.date IS NULL AND d.id {cmp} ?"
+                                seek_params = [after_id]
+                        # Add sorting and pagination
+                        if sort == "newest":
+                            base_sql += " ORDER BY (d.date IS NULL), d.date DESC, d.id DESC"
+                        elif sort == "oldest":
+                            base_sql += " ORDER BY (d.date IS NULL), d.date ASC, d.id ASC"
+                        elif q_text:
+                            base_sql += " ORDER BY rank"
+                        else:
+                            base_sql += " ORDER BY (d.date IS NULL), d.date DESC, d.id DESC"
+                        
+                        # Bound LIMIT/OFFSET so every request with the same filters
+                        # shares one SQL text, and with it the cached prepared statement
+                        base_sql += " LIMIT ? OFFSET ?"
+                        page_params = [*seek_params, per_page, 0 if seek else offset]
+                        # Plain tuples for the page rows: they are only unpacked by
+                        # position, so sqlite3.Row wrappers would be wasted work
+                        page_cur = conn.cursor()
+                        page_cur.row_factory = None
+                        # The count already says whether this page has any rows
+                        if total_count > offset or total_count > SEARCH_COUNT_CAP:
+                            rows = page_cur.execute(base_sql, (*params, *page_params)).fetchall()
+                        else:
+                            rows = []
+                        
+                        # Fallback with expanded tokens if no results
+                        if not rows and not wild and offset == 0 and q_text:
+                            q_try = _expand_tokens(q_text)
+                            params[0] = q_try
+                            rows = page_cur.execute(base_sql, (*params, *page_params)).fetchall()
+                            # A short first page is the whole result; only count a full one
+                            if len(rows) < per_page:
+                                total_count = len(rows)
+                            else:
+                                total_count = pool.count(conn, count_sql, tuple(params))
+                        
+                        if rows and sort in ("newest", "oldest"):
+                            next_after_date = rows[-1][5] or ""
+                            next_after_id = rows[-1][1]
+                        
+                        if rows and q_text:
+                            # FTS5 re-runs the MATCH for every value of a plain rowid IN,
+                            # so seek one rowid range and filter with +rowid (not indexed)
+                            page_rowids = [r[0] for r in rows]
+                            snip_sql = (
+                                "SELECT rowid, snippet(docs_fts, 0, '<mark>', '</mark>', ' … ', 12) "
+                                "FROM docs_fts WHERE docs_fts MATCH ? AND rowid BETWEEN ? AND ? "
+                                "AND +rowid IN ({})"
+                            ).format(",".join("?" * len(page_rowids)))
+                            snips = dict(conn.execute(
+                                snip_sql, (params[0], min(page_rowids), max(page_rowids), *page_rowids)
+                            ))
+                        elif rows:
+                            # Field filters only: no MATCH for snippet(), so show the
+                            # message's leading text, escaped since it renders |safe
+                            page_rowids = [r[0] for r in rows]
+                            excerpt_sql = (
+                                "SELECT rowid, substr(content, 1, ?), length(content) > ? "
+                                "FROM docs WHERE rowid IN ({})"
+                            ).format(",".join("?" * len(page_rowids)))
+                            snips = {
+                                rowid: escape(text or "") + (" …" if more else "")
+                                for rowid, text, more in conn.execute(
+                                    excerpt_sql, (SNIPPET_EXCERPT_CHARS, SNIPPET_EXCERPT_CHARS, *page_rowids)
+                                )
+                            }
+                    
+                    pool.store_page(page_key, (rows, snips, total_count, next_after_date, next_after_id))
+
+            # Unpack rows positionally (same order as the search SELECT) rather
+            # than by name, which scans the column names on every lookup
+            enriched = None if rows is None else [
+                {
+                    "id": doc_id,
+                    "conv_id": conv_id,
+                    "title": title,
+                    "role": role,
+                    "date": date,
+                    "source": source,
+                    "snip": snips.get(rowid, ""),
+                    "external_url": external_url(conv_id, source),
+                    **_provider_display(source),
+                } for rowid, doc_id, conv_id, title, role, date, source in rows
+            ]
             
-            # Add sorting and pagination
-            if sort == "newest":
-                base_sql += " ORDER BY (d.date IS NULL), d.date DESC"
-            elif sort == "oldest":
-                base_sql += " ORDER BY (d.date IS NULL), d.date ASC"
-            else:
-                base_sql += " ORDER BY rank"
+            # Calculate pagination info
+            count_capped = total_count > SEARCH_COUNT_CAP
+            if count_capped:
+                total_count = SEARCH_COUNT_CAP
+            total_pages = (total_count + per_page - 1) // per_page if total_count > 0 else 0
+            has_prev = page > 1
+            # Past the cap, a full page is the only hint that more rows follow
+            has_next = page < total_pages or (count_capped and rows is not None and len(rows) == per_page)
             
-            base_sql += f" LIMIT {per_page} OFFSET {offset}"
-            rows = db_holder["conn"].execute(base_sql, tuple(params)).fetchall()
+            # Query string shared by every pager link, encoded once; urlencode
+            # output has no HTML-special characters, so it can skip autoescape
+            paginate_base = Markup(urlencode({
+                "q": q,
+                "wild": int(wild),
+                "provider": provider_filter,
+                "role": role_filter,
+                "date_from": date_from or "",
+                "date_to": date_to or "",
+                "sort": sort,
+            }))
             
-            # Fallback with expanded tokens if no results
-            if not rows and not wild and offset == 0:
-                q_try = expand_tokens(q)
-                params[0] = q_try
-                # Recalculate count with expanded query
-                total_count = db_holder["conn"].execute(count_sql, tuple(params)).fetchone()[0]
-                rows = db_holder["conn"].execute(base_sql, tuple(params)).fetchall()
-
-        export_default = os.path.abspath(os.path.join(os.path.dirname(__file__), 'files'))
-        def looks_like_uuid(u: str) -> bool:
-            try:
-                return bool(re.match(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$", u or ""))
-            except Exception:
-                return False
-        
-        def safe_url_format(template: str, conv_id: str, source: str = "") -> str:
+            return {
+                "rows": enriched,
+                "total_count": total_count,
+                "count_capped": count_capped,
+                "total_pages": total_pages,
+                "has_prev": has_prev,
+                "has_next": has_next,
+                "next_after_date": next_after_date,
+                "next_after_id": next_after_id,
+                "paginate_base": paginate_base,
+            }
+
+        # Render the head now, not inside the stream: it pops the flashed
+        # messages, and the session is saved before the body is iterated
+        head = home_head.render(head_ctx)
+
+        def generate() -> Iterator[str]:
+            # The head goes out before the query runs, so the browser fetches
+            # the stylesheet and paints the form while SQLite works
+            yield head
             try:
-                # Handle ChatGPT links
-                if "chatgpt" in source.lower():
-                    return f"https://chatgpt.com/c/{conv_id}"
-                
-                # Handle Claude links with template
-                if "{conv_id}" in template:
-                    return template.replace("{conv_id}", conv_id)
-                elif "%7Bconv_id%7D" in template:
-                    return template.replace("%7Bconv_id%7D", conv_id)
-                else:
-                    # If no placeholder, just append the conv_id
-                    return f"{template.rstrip('/')}/{conv_id}"
-            except Exception:
-                return None
-        
-        enriched = None if rows is None else [
-            {
-                "id": r["id"],
-                "conv_id": r["conv_id"],
-                "title": r["title"],
-                "role": r["role"],
-                "date": r["date"],
-                "source": r["source"],
-                "snip": r["snip"],
-                "external_url": (
-                    safe_url_format(claude_url_template, r["conv_id"], r["source"]) 
-                    if (r["source"] and (
-                        ("anthropic" in r["source"] and looks_like_uuid(r["conv_id"])) or
-                        ("chatgpt" in r["source"] and r["conv_id"])
-                    )) else None
-                ),
-            } for r in rows
-        ]
-        
-        # Calculate pagination info
-        total_pages = (total_count + per_page - 1) // per_page if total_count > 0 else 0
-        has_prev = page > 1
-        has_next = page < total_pages
-        
-        return render_template_string(
-            TEMPLATE,
-            q=q,
-            rows=enriched,
-            wild=wild,
-            date_from=date_from or "",
-            date_to=date_to or "",
-            sort=sort,
-            provider=provider_filter,
-            role=role_filter,
-            page=page,
-            per_page=per_page,
-            total_count=total_count,
-            total_pages=total_pages,
-            has_prev=has_prev,
-            has_next=has_next,
-            export_default=export_default,
-        )
+                results = search_results()
+            except sqlite3.OperationalError:
+                # Too late for an error status: log it (e.g. an FTS syntax
+                # error) and finish the page with an empty result list
+                app.logger.exception("Search failed for %r", q)
+                results = {"rows": [], "total_count": 0, "count_capped": False, "total_pages": 0,
+                           "has_prev": page > 1, "has_next": False}
+            yield from _buffered(home_results.generate({**head_ctx, **results}))
+
+        return app.response_class(stream_with_context(generate()), mimetype="text/html")
 
     @app.route("/reindex", methods=["POST"])
     def reindex():
@@ -908,7 +1063,6 @@ def make_app(db_path: str):
             # Continue anyway - some files might be optional
         out_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'index'))
         try:
-            from pathlib import Path
             from indexer import build_index_multi
             exports = [e.strip() for e in export.split(',') if e.strip()]
             srcs = []
@@ -918,15 +1072,17 @@ def make_app(db_path: str):
                     srcs.append((p.name or "default", p))
             if not srcs:
                 raise RuntimeError("No valid export directories.")
-            db_path = build_index_multi(srcs, Path(out_dir))
+            # Live search connections stay open, so keep WAL durability
+            # Parse inline: never fork a process pool from the threaded server
+            db_path = build_index_multi(srcs, Path(out_dir), bulk=False, workers=1)
         except Exception as e:
             flash(f"❌ Reindex failed: {str(e)[:100]}...")
             return redirect(url_for('home'))
         try:
-            db_holder["conn"].close()
-            db_holder["conn"] = sqlite3.connect(str(db_path), check_same_thread=False)
-            db_holder["conn"].row_factory = sqlite3.Row
+            old_pool = db_holder["pool"]
+            db_holder["pool"] = ReadPool(str(db_path))
             db_holder["db_path"] = str(db_path)
+            old_pool.close()
             flash("✅ Reindex complete! Database updated successfully.")
         except Exception as e:
             flash(f"⚠️ Reindex complete, but failed to reload database: {str(e)[:50]}..."        )
@@ -934,9 +1090,8 @@ def make_app(db_path: str):
 
     @app.route("/admin", methods=["GET"])
     def admin():
-        export_default = os.path.abspath(os.path.join(os.path.dirname(__file__), 'files'))
-        return render_template_string(
-            ADMIN_TEMPLATE,
+        return render_template(
+            admin_template,
             export_default=export_default,
             db_path=db_holder["db_path"]
         )
@@ -946,10 +1101,9 @@ def make_app(db_path: str):
         """Analytics API endpoint"""
         try:
             from analytics import ConversationAnalytics
-            analytics = ConversationAnalytics(db_holder["db_path"])
-            
-            overview = analytics.get_overview_stats()
-            temporal = analytics.get_temporal_patterns()
+            with ConversationAnalytics(db_holder["db_path"]) as analytics:
+                overview = analytics.get_overview_stats()
+                temporal = analytics.get_temporal_patterns()
             
             return jsonify({
                 'overview': overview,
@@ -1002,20 +1156,19 @@ body { font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; marg
   </div>
 {% endfor %}
 """
+    detail_template = app.jinja_env.from_string(DETAIL_TEMPLATE)
 
     @app.route("/api/conversation/<conv_id>")
     def api_conversation(conv_id):
         """API endpoint for conversation shelf"""
         try:
-            rows = db_holder["conn"].execute(
-                "SELECT title, role, date, ts, content, source FROM docs WHERE conv_id=? ORDER BY ts, rowid",
-                (conv_id,)
-            ).fetchall()
+            with db_holder["pool"].acquire() as conn:
+                rows = _conversation_rows(conn, conv_id)
             if not rows:
                 return {"error": "Conversation not found", "suggestion": "Try reindexing your conversations if you see this error frequently."}, 404
 
-            title = rows[0]["title"] or f"Conversation {conv_id}"
-            messages = [{"role": r["role"], "date": r["date"], "content": r["content"]} for r in rows]
+            title = rows[0][3] or f"Conversation {conv_id}"
+            messages = [{"role": role, "date": date, "content": content} for role, date, content, *_ in rows]
 
             return {
                 "title": title,
@@ -1027,10 +1180,8 @@ body { font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; marg
 
     @app.route("/conv/<conv_id>")
     def conversation(conv_id):
-        rows = db_holder["conn"].execute(
-            "SELECT title, role, date, ts, content, source FROM docs WHERE conv_id=? ORDER BY ts, rowid",
-            (conv_id,)
-        ).fetchall()
+        with db_holder["pool"].acquire() as conn:
+            rows = _conversation_rows(conn, conv_id)
         if not rows:
             # Instead of redirecting, show an error page in the new tab
             error_template = """
@@ -1051,26 +1202,27 @@ body { font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; marg
             </div>
             """
             return render_template_string(error_template, conv_id=conv_id)
-        title = rows[0]["title"] or f"Conversation {conv_id}"
+        title = rows[0][3] or f"Conversation {conv_id}"
         first_date = None
         for r in rows:
-            if r["date"]:
-                first_date = r["date"]
+            if r[1]:
+                first_date = r[1]
                 break
         # Only enable external link for Anthropic conversations that look like UUIDs
-        def looks_like_uuid(u: str) -> bool:
-            try:
-                return bool(re.match(r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$", u or ""))
-            except Exception:
-                return False
-        sources = {r["source"] for r in rows if r["source"]}
-        is_anthropic = any("anthropic" in s for s in sources)
-        is_chatgpt = any("chatgpt" in s for s in sources)
+        # Any row may enable a provider; stop once both are seen
+        is_anthropic = is_chatgpt = False
+        for r in rows:
+            if r[4]:
+                is_anthropic = True
+            if r[5]:
+                is_chatgpt = True
+            if is_anthropic and is_chatgpt:
+                break
         external_url = None
         
         if is_chatgpt:
             external_url = f"https://chatgpt.com/c/{conv_id}"
-        elif is_anthropic and looks_like_uuid(conv_id):
+        elif is_anthropic and _looks_like_uuid(conv_id):
             try:
                 if "{conv_id}" in claude_url_template:
                     external_url = claude_url_template.replace("{conv_id}", conv_id)
@@ -1081,9 +1233,9 @@ body { font-family: system-ui, -apple-system, Segoe UI, Roboto, sans-serif; marg
                     external_url = f"{claude_url_template.rstrip('/')}/{conv_id}"
             except Exception:
                 external_url = None
-        messages = [{"role": r["role"], "date": r["date"], "content": r["content"]} for r in rows]
-        return render_template_string(
-            DETAIL_TEMPLATE,
+        messages = [{"role": role, "date": date, "content": content} for role, date, content, *_ in rows]
+        return render_template(
+            detail_template,
             conv_id=conv_id,
             title=title,
             messages=messages,
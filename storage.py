@@ -25,10 +25,13 @@ from schema import (
 class KnowledgeStore:
     """SQLite-based storage for conversations and knowledge graph."""
     
-    def __init__(self, db_path: Path):
+    def __init__(self, db_path: Path, defer_indexes: bool = False):
         self.db_path = db_path
         self.conn = self._connect()
-        self._ensure_schema()
+        self._ensure_tables()
+        # Bulk loaders create indexes and turns_fts themselves once the data is in
+        if not defer_indexes:
+            self._ensure_indexes()
     
     def _connect(self) -> sqlite3.Connection:
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
@@ -37,9 +40,11 @@ class KnowledgeStore:
         conn.execute("PRAGMA journal_mode=WAL;")
         conn.execute("PRAGMA synchronous=NORMAL;")
         conn.execute("PRAGMA foreign_keys=ON;")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        conn.execute("PRAGMA cache_size=-262144;")
         return conn
     
-    def _ensure_schema(self):
+    def _ensure_tables(self):
         """Create all required tables."""
         
         # Core tables
@@ -155,7 +160,12 @@ class KnowledgeStore:
                 metadata TEXT,
                 FOREIGN KEY (turn_id) REFERENCES turns(id)
             );
-            
+        """)
+        self.conn.commit()
+    
+    def _ensure_indexes(self):
+        """Create the secondary indexes and the turns_fts table."""
+        self.conn.executescript("""
             -- FTS5 for full-text search on turns
             CREATE VIRTUAL TABLE IF NOT EXISTS turns_fts USING fts5(
                 content, title, role, source, conv_id, 
@@ -176,100 +186,105 @@ class KnowledgeStore:
     
     def add_conversation(self, conv: Conversation, account: str = "default") -> None:
         """Add a conversation and all its turns to the store."""
+        self.add_conversations_batch([conv], account)
+    
+    def add_conversations_batch(self, convs: List[Conversation], account: str = "default",
+                                index_fts: bool = True) -> None:
+        """Add several conversations with one executemany per table.
+
+        With ``index_fts=False`` turns_fts is left alone; the caller fills it
+        later with index_turns_fts().
+        """
+        conv_rows, turn_rows = [], []
+        node_rows, edge_rows, code_rows, link_rows = [], [], [], []
         
-        # Insert conversation
-        self.conn.execute("""
+        for conv in convs:
+            conv_rows.append((
+                conv.id, conv.title, conv.source.value,
+                conv.created_at, conv.updated_at, account,
+                json.dumps(conv.tags), json.dumps(conv.metadata)
+            ))
+            
+            # Create node for conversation
+            node_rows.append((conv.id, NodeType.CONVERSATION.value, conv.title, conv.id, "conversations", "{}"))
+            
+            prev_turn_id = None
+            for i, turn in enumerate(conv.turns):
+                turn_rows.append((
+                    turn.id, conv.id, turn.role, turn.content,
+                    turn.timestamp, turn.model, i, json.dumps(turn.metadata)
+                ))
+                
+                # Create node for turn and CONTAINS edge from conversation to turn
+                node_rows.append((turn.id, NodeType.TURN.value, f"{turn.role}: {turn.content[:50]}...", turn.id, "turns", "{}"))
+                edge_rows.append((f"{conv.id}->contains->{turn.id}", EdgeType.CONTAINS.value, conv.id, turn.id, 1.0, "{}"))
+                
+                # Extract code blocks, each with an artifact node and edge
+                for cb in extract_code_blocks(turn.content, turn.id):
+                    code_rows.append((cb.id, turn.id, cb.language, cb.content, cb.start_line, json.dumps(cb.metadata)))
+                    node_rows.append((cb.id, NodeType.ARTIFACT.value, f"Code: {cb.language}", cb.id, "code_blocks", "{}"))
+                    edge_rows.append((f"{turn.id}->produces->{cb.id}", EdgeType.PRODUCES.value, turn.id, cb.id, 1.0, "{}"))
+                
+                # Extract links
+                for link in extract_links(turn.content, turn.id):
+                    link_rows.append((link.id, turn.id, link.url, link.text, link.domain, json.dumps(link.metadata)))
+                
+                # Create FOLLOWS edge between consecutive turns
+                if prev_turn_id:
+                    edge_rows.append((f"{prev_turn_id}->follows->{turn.id}", EdgeType.FOLLOWS.value, prev_turn_id, turn.id, 1.0, "{}"))
+                prev_turn_id = turn.id
+        
+        # Parents before children so foreign keys always resolve
+        self.conn.executemany("""
             INSERT OR REPLACE INTO conversations 
             (id, title, source, created_at, updated_at, account, tags, metadata)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            conv.id, conv.title, conv.source.value,
-            conv.created_at, conv.updated_at, account,
-            json.dumps(conv.tags), json.dumps(conv.metadata)
-        ))
-        
-        # Create node for conversation
-        self._add_node(conv.id, NodeType.CONVERSATION, conv.title, conv.id, "conversations")
-        
-        prev_turn_id = None
-        for i, turn in enumerate(conv.turns):
-            self._add_turn(turn, conv, i, account)
-            
-            # Create FOLLOWS edge between consecutive turns
-            if prev_turn_id:
-                self._add_edge(
-                    f"{prev_turn_id}->follows->{turn.id}",
-                    EdgeType.FOLLOWS, prev_turn_id, turn.id
-                )
-            prev_turn_id = turn.id
-    
-    def _add_turn(self, turn: Turn, conv: Conversation, index: int, account: str) -> None:
-        """Add a turn and extract metadata."""
-        
-        # Insert turn
-        self.conn.execute("""
+        """, conv_rows)
+        last_rowid = self.last_turn_rowid()
+        self.conn.executemany("""
             INSERT OR REPLACE INTO turns
             (id, conv_id, role, content, timestamp, model, turn_index, metadata)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            turn.id, conv.id, turn.role, turn.content,
-            turn.timestamp, turn.model, index, json.dumps(turn.metadata)
-        ))
-        
-        # Add to FTS
-        self.conn.execute("""
-            INSERT INTO turns_fts (rowid, content, title, role, source, conv_id)
-            SELECT rowid, ?, ?, ?, ?, ?
-            FROM turns WHERE id = ?
-        """, (turn.content, conv.title, turn.role, conv.source.value, conv.id, turn.id))
-        
-        # Create node for turn
-        self._add_node(turn.id, NodeType.TURN, f"{turn.role}: {turn.content[:50]}...", turn.id, "turns")
-        
-        # Create CONTAINS edge from conversation to turn
-        self._add_edge(
-            f"{conv.id}->contains->{turn.id}",
-            EdgeType.CONTAINS, conv.id, turn.id
-        )
-        
-        # Extract and store code blocks
-        code_blocks = extract_code_blocks(turn.content, turn.id)
-        for cb in code_blocks:
-            self.conn.execute("""
-                INSERT OR REPLACE INTO code_blocks
-                (id, turn_id, language, content, start_line, metadata)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (cb.id, turn.id, cb.language, cb.content, cb.start_line, json.dumps(cb.metadata)))
-            
-            # Create artifact node and edge
-            self._add_node(cb.id, NodeType.ARTIFACT, f"Code: {cb.language}", cb.id, "code_blocks")
-            self._add_edge(f"{turn.id}->produces->{cb.id}", EdgeType.PRODUCES, turn.id, cb.id)
-        
-        # Extract and store links
-        links = extract_links(turn.content, turn.id)
-        for link in links:
-            self.conn.execute("""
-                INSERT OR REPLACE INTO links
-                (id, turn_id, url, text, domain, metadata)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (link.id, turn.id, link.url, link.text, link.domain, json.dumps(link.metadata)))
-    
-    def _add_node(self, node_id: str, node_type: NodeType, label: str, 
-                  ref_id: str, ref_table: str, metadata: Dict = None) -> None:
-        """Add a node to the knowledge graph."""
-        self.conn.execute("""
+        """, turn_rows)
+        if index_fts:
+            self.index_turns_fts(last_rowid)
+        self.conn.executemany("""
             INSERT OR REPLACE INTO nodes (id, type, label, ref_id, ref_table, metadata)
             VALUES (?, ?, ?, ?, ?, ?)
-        """, (node_id, node_type.value, label, ref_id, ref_table, json.dumps(metadata or {})))
-    
-    def _add_edge(self, edge_id: str, edge_type: EdgeType, 
-                  source_id: str, target_id: str, weight: float = 1.0, 
-                  metadata: Dict = None) -> None:
-        """Add an edge to the knowledge graph."""
-        self.conn.execute("""
+        """, node_rows)
+        self.conn.executemany("""
             INSERT OR REPLACE INTO edges (id, type, source_id, target_id, weight, metadata)
             VALUES (?, ?, ?, ?, ?, ?)
-        """, (edge_id, edge_type.value, source_id, target_id, weight, json.dumps(metadata or {})))
+        """, edge_rows)
+        self.conn.executemany("""
+            INSERT OR REPLACE INTO code_blocks
+            (id, turn_id, language, content, start_line, metadata)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, code_rows)
+        self.conn.executemany("""
+            INSERT OR REPLACE INTO links
+            (id, turn_id, url, text, domain, metadata)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, link_rows)
+    
+    def last_turn_rowid(self) -> int:
+        """Highest turns rowid so far (0 when empty)."""
+        return self.conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM turns").fetchone()[0]
+    
+    def index_turns_fts(self, after_rowid: int = 0) -> None:
+        """Add turns_fts rows for every turn with rowid above ``after_rowid``.
+
+        Turns written with INSERT OR REPLACE (including replaced ones) always
+        get rowids above the previous maximum, so one rowid range scan covers
+        a whole batch instead of a primary-key lookup per turn.
+        """
+        self.conn.execute("""
+            INSERT INTO turns_fts (rowid, content, title, role, source, conv_id)
+            SELECT t.rowid, t.content, c.title, t.role, c.source, t.conv_id
+            FROM turns t JOIN conversations c ON c.id = t.conv_id
+            WHERE t.rowid > ?
+            ORDER BY t.rowid
+        """, (after_rowid,))
     
     def search(self, query: str, limit: int = 50, offset: int = 0,
                provider: Optional[str] = None, role: Optional[str] = None,
@@ -418,6 +433,10 @@ class KnowledgeStore:
 
 # Migration helper to convert old indexer format to new storage
 
+# Conversations per batch insert and commit during migration
+MIGRATE_BATCH_CONVS = 500
+
+
 def migrate_from_legacy(legacy_db: Path, new_db: Path) -> None:
     """Migrate data from legacy indexer.py format to new KnowledgeStore."""
     import sqlite3
@@ -425,7 +444,12 @@ def migrate_from_legacy(legacy_db: Path, new_db: Path) -> None:
     old_conn = sqlite3.connect(str(legacy_db))
     old_conn.row_factory = sqlite3.Row
     
-    store = KnowledgeStore(new_db)
+    # Load first, then build indexes and turns_fts once over the finished tables
+    store = KnowledgeStore(new_db, defer_indexes=True)
+    # The migration can simply be rerun, so trade durability for speed
+    store.conn.execute("PRAGMA synchronous=OFF;")
+    store.conn.execute("PRAGMA journal_mode=MEMORY;")
+    start_rowid = store.last_turn_rowid()
     
     # Group docs by conversation
     convs = {}
@@ -441,7 +465,9 @@ def migrate_from_legacy(legacy_db: Path, new_db: Path) -> None:
             }
         convs[conv_id]["turns"].append(row)
     
-    # Convert to new format
+    # Convert to new format, committing every MIGRATE_BATCH_CONVS conversations
+    batch = []
+    batch_account = None
     for conv_data in convs.values():
         turns = []
         for i, t in enumerate(conv_data["turns"]):
@@ -462,9 +488,21 @@ def migrate_from_legacy(legacy_db: Path, new_db: Path) -> None:
             updated_at=turns[-1].timestamp if turns else 0.0,
             turns=turns
         )
-        store.add_conversation(conv, conv_data["account"])
+        if batch and (conv_data["account"] != batch_account or len(batch) >= MIGRATE_BATCH_CONVS):
+            store.add_conversations_batch(batch, batch_account, index_fts=False)
+            store.commit()
+            batch = []
+        batch.append(conv)
+        batch_account = conv_data["account"]
+    if batch:
+        store.add_conversations_batch(batch, batch_account, index_fts=False)
+    store.commit()
     
+    store._ensure_indexes()
+    store.index_turns_fts(start_rowid)
     store.commit()
+    store.conn.execute("PRAGMA journal_mode=WAL;")
+    store.conn.execute("PRAGMA synchronous=NORMAL;")
     store.close()
     old_conn.close()
 
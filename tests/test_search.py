@@ -0,0 +1,70 @@
+import re
+import tempfile
+import unittest
+from pathlib import Path
+
+from indexer import add_docs_batch, ensure_db
+from server import make_app
+
+_RESULT_CONTENT_RE = re.compile(r'class="result-content"[^>]*>\s*(.*?)\s*<div class="expand-btn"', re.S)
+
+
+class SearchAppTestCase(unittest.TestCase):
+    """Serves a small freshly built index through the Flask test client."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        db_path = Path(self.tmp.name) / "chatgpt.db"
+        conn = ensure_db(db_path)
+        add_docs_batch(conn, [
+            {"id": "c1:0", "conv_id": "c1", "title": "First", "role": "user", "ts": 1700000000.0,
+             "source": "chatgpt.conversations.json", "content": "Is <b>bold</b> markup escaped?"},
+            {"id": "c1:1", "conv_id": "c1", "title": "First", "role": "assistant", "ts": 1700000060.0,
+             "source": "chatgpt.conversations.json", "content": "Yes " + "long answer " * 40},
+            {"id": "c2:0", "conv_id": "c2", "title": "Second", "role": "user", "ts": 1700000120.0,
+             "source": "chatgpt.conversations.json", "content": "Another conversation"},
+        ], "default")
+        conn.commit()
+        conn.close()
+        self.client = make_app(str(db_path)).test_client()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _result_contents(self, q):
+        resp = self.client.get("/", query_string={"q": q})
+        self.assertEqual(resp.status_code, 200)
+        return _RESULT_CONTENT_RE.findall(resp.get_data(as_text=True))
+
+
+class FieldFilterSearchTest(SearchAppTestCase):
+    """field:value queries filter on docs columns instead of FTS."""
+
+    def test_field_only_query_shows_escaped_excerpt(self):
+        contents = self._result_contents('conv_id:"c1"')
+        self.assertEqual(len(contents), 2)
+        self.assertNotIn("None", contents)
+        self.assertIn("Is &lt;b&gt;bold&lt;/b&gt; markup escaped?", contents)
+        # Long messages are cut to an excerpt
+        long_excerpt = next(c for c in contents if c.startswith("Yes"))
+        self.assertTrue(long_excerpt.endswith("…"))
+        self.assertLess(len(long_excerpt), 200)
+
+    def test_field_filter_narrows_text_query(self):
+        contents = self._result_contents("conversation role:user")
+        self.assertEqual(len(contents), 1)
+        self.assertIn("<mark>", contents[0])
+
+
+class FlashMessageTest(SearchAppTestCase):
+    """Flashed messages on the streamed search page are shown only once."""
+
+    def test_flash_is_consumed(self):
+        resp = self.client.post("/reindex", data={"export": "/nonexistent/export"})
+        self.assertEqual(resp.status_code, 302)
+        pages = [self.client.get("/").get_data(as_text=True) for _ in range(3)]
+        self.assertEqual([("Directory not found" in page) for page in pages], [True, False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
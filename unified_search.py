@@ -11,9 +11,10 @@ import json
 import re
 from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
-from datetime import datetime, timezone
 import html
 
+from indexer import ensure_docs_fts, split_field_filters, ts_to_date
+
 
 class QueryParser:
     """Advanced query parser supporting boolean operators and phrases."""
@@ -159,12 +160,8 @@ class UnifiedSearchService:
             )
         """)
 
-        # Create FTS5 virtual table if it doesn't exist
-        conn.execute("""
-            CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
-                content, title, role, source, conv_id, ts, date, account, doc_id UNINDEXED, tokenize='porter'
-            )
-        """)
+        # Create the external-content FTS5 index (and its sync triggers)
+        ensure_docs_fts(conn)
 
         # Create indexes
         conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_date ON docs(date)")
@@ -185,18 +182,6 @@ class UnifiedSearchService:
             )
         """)
 
-        # Populate FTS table if empty
-        try:
-            fts_count = conn.execute("SELECT COUNT(*) FROM docs_fts").fetchone()[0]
-            if fts_count == 0:
-                conn.execute("""
-                    INSERT INTO docs_fts(rowid, content, title, role, source, conv_id, ts, date, account, doc_id)
-                    SELECT rowid, content, title, role, source, conv_id, CAST(ts AS TEXT), date, COALESCE(account, 'default'), id
-                    FROM docs
-                """)
-        except Exception:
-            pass
-
         conn.commit()
         conn.close()
 
@@ -233,58 +218,72 @@ class UnifiedSearchService:
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
 
-        # Build base query
-        base_sql = """
-            SELECT d.id, d.conv_id, d.title, d.role, d.date, d.source, d.ts, d.account,
-                   snippet(docs_fts, 0, '<mark>', '</mark>', ' … ', 12) as snip
+        # role:/source:/... tokens filter on docs columns; docs_fts only
+        # indexes content and title
+        text_query, field_filters = split_field_filters(query or "")
+        use_fts = bool(text_query) or not field_filters
+
+        params = []
+        if use_fts:
+            snip_sql = "snippet(docs_fts, 0, '<mark>', '</mark>', ' … ', 12)"
+            from_sql = """
             FROM docs_fts
             JOIN docs d ON d.rowid = docs_fts.rowid
             WHERE docs_fts MATCH ?
-        """
+            """
+            search_query = self._expand_query(text_query) if text_query else ""
+            params.append(search_query)
+        else:
+            # Only field filters: no MATCH, so no rank, and the leading
+            # text stands in for the snippet
+            snip_sql = "substr(d.content, 1, 160)"
+            from_sql = " FROM docs d WHERE 1"
 
-        params = []
-        search_query = self._expand_query(query) if query else ""
-        params.append(search_query)
+        for condition, value in field_filters:
+            from_sql += f" AND {condition}"
+            params.append(value)
 
         # Add filters
         if provider:
             if provider == "claude":
-                base_sql += " AND d.source LIKE '%anthropic%'"
+                from_sql += " AND d.source LIKE '%anthropic%'"
             elif provider == "chatgpt":
-                base_sql += " AND d.source LIKE '%chatgpt%'"
+                from_sql += " AND d.source LIKE '%chatgpt%'"
 
         if role:
             if role == "assistant":
-                base_sql += " AND (d.role = 'assistant' OR d.role = 'system')"
+                from_sql += " AND (d.role = 'assistant' OR d.role = 'system')"
             else:
-                base_sql += " AND d.role = ?"
+                from_sql += " AND d.role = ?"
                 params.append(role)
 
         if date_from:
-            base_sql += " AND (d.date IS NOT NULL AND d.date >= ?)"
+            from_sql += " AND (d.date IS NOT NULL AND d.date >= ?)"
             params.append(date_from)
 
         if date_to:
-            base_sql += " AND (d.date IS NOT NULL AND d.date <= ?)"
+            from_sql += " AND (d.date IS NOT NULL AND d.date <= ?)"
             params.append(date_to)
 
         if account:
-            base_sql += " AND d.account = ?"
+            from_sql += " AND d.account = ?"
             params.append(account)
 
         # Get total count
-        count_sql = base_sql.replace(
-            "SELECT d.id, d.conv_id, d.title, d.role, d.date, d.source, d.ts, d.account, snippet(docs_fts, 0, '<mark>', '</mark>', ' … ', 12) as snip",
-            "SELECT COUNT(*)"
-        )
+        count_sql = "SELECT COUNT(*)" + from_sql
 
         total_count = conn.execute(count_sql, tuple(params)).fetchone()[0]
 
+        base_sql = (
+            "SELECT d.id, d.conv_id, d.title, d.role, d.date, d.source, d.ts, d.account, "
+            f"{snip_sql} as snip" + from_sql
+        )
         # Add sorting and pagination
-        if sort_by == "newest":
-            base_sql += " ORDER BY (d.date IS NULL), d.date DESC, rank"
+        tiebreak = "rank" if use_fts else "d.id"
+        if sort_by == "newest" or (sort_by == "rank" and not use_fts):
+            base_sql += f" ORDER BY (d.date IS NULL), d.date DESC, {tiebreak}"
         elif sort_by == "oldest":
-            base_sql += " ORDER BY (d.date IS NULL), d.date ASC, rank"
+            base_sql += f" ORDER BY (d.date IS NULL), d.date ASC, {tiebreak}"
         else:
             base_sql += " ORDER BY rank"
 
@@ -393,26 +392,18 @@ class UnifiedSearchService:
             extra = json.dumps(doc_data.get("extra", {})) if doc_data.get("extra") else None
 
             # Convert timestamp to date
-            date_str = None
-            if ts:
-                try:
-                    dt = datetime.fromtimestamp(ts, tz=timezone.utc)
-                    date_str = dt.strftime('%Y-%m-%d')
-                except Exception:
-                    date_str = None
-
-            # Insert into main table
+            date_str = ts_to_date(ts)
+
+            # Insert into main table; docs_fts is kept in sync by triggers
             conn.execute("""
-                INSERT OR REPLACE INTO docs(id, conv_id, title, role, ts, date, source, content, account, extra)
+                INSERT INTO docs(id, conv_id, title, role, ts, date, source, content, account, extra)
                 VALUES (?,?,?,?,?,?,?,?,?,?)
+                ON CONFLICT(id) DO UPDATE SET
+                    conv_id=excluded.conv_id, title=excluded.title, role=excluded.role, ts=excluded.ts,
+                    date=excluded.date, source=excluded.source, content=excluded.content,
+                    account=excluded.account, extra=excluded.extra
             """, (doc_id, conv_id, title, role, ts, date_str, source, content, account, extra))
 
-            # Insert into FTS table
-            conn.execute("""
-                INSERT INTO docs_fts(rowid, content, title, role, source, conv_id, ts, date, account, doc_id)
-                VALUES ((SELECT rowid FROM docs WHERE id=?),?,?,?,?,?,?,?,?,?)
-            """, (doc_id, content, title, role, source, conv_id, str(ts), date_str, account, doc_id))
-
             conn.commit()
             conn.close()
             return True